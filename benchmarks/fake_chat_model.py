@@ -0,0 +1,33 @@
+"""Deterministic stand-in for the Groq chat model used in agent benchmarks."""
+import uuid
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """Answers every user turn with one hourly-forecast tool call per location, then a fixed reply."""
+
+    tool_name: str = "get_hourly_forecast"
+    locations: List[str] = ["London"]
+    reply: str = "Temperature: 17.3°C\n→ Mild afternoon\n✓ A light jacket is enough."
+
+    @property
+    def _llm_type(self):
+        return "fake-weather-chat"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if isinstance(messages[-1], HumanMessage):
+            message = AIMessage(content="", tool_calls=[{
+                "name": self.tool_name,
+                "args": {"location": location},
+                "id": f"call_{uuid.uuid4().hex[:12]}"
+            } for location in self.locations])
+        else:
+            message = AIMessage(content=self.reply)
+        return ChatResult(generations=[ChatGeneration(message=message)])
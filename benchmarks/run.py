@@ -0,0 +1,212 @@
+"""Offline latency benchmarks for the fetch, render and agent paths.
+
+Runs entirely against benchmarks/stub_server.py, benchmarks/stub_redis.py and
+a fake chat model, so no Nominatim, Open-Meteo, Redis or Groq access is needed:
+
+    python -m benchmarks.run --iterations 50
+    python -m benchmarks.run --only figure --json bench.json
+
+Each case is timed over N iterations (p50/p95/mean in ms) and then run once
+more under tracemalloc to report the peak allocation of a single call. The
+approximate size of the tool results the agent cases produced is printed last.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+
+from benchmarks.stub_redis import StubRedis
+from benchmarks.stub_server import StubServer
+
+POINTS = [(51.5 + i * 0.1, -0.12 + i * 0.1) for i in range(25)]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(name, fn, iterations, setup=None):
+    """Time `fn` over `iterations` runs; `setup` runs untimed before each call."""
+    durations = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": iterations,
+        "p50_ms": percentile(durations, 50),
+        "p95_ms": percentile(durations, 95),
+        "mean_ms": statistics.fmean(durations),
+        "peak_alloc_kib": peak / 1024
+    }
+
+
+def build_cases(server, redis):
+    """Import the app components against the stub servers and return the benchmark cases."""
+    host = server.base_url.split("://", 1)[1]
+    os.environ.update({
+        "OPEN_METEO_FORECAST_URL": f"{server.base_url}/v1/forecast",
+        "OPEN_METEO_AIR_QUALITY_URL": f"{server.base_url}/v1/air-quality",
+        "NOMINATIM_DOMAIN": host,
+        "NOMINATIM_SCHEME": "http",
+        "NOMINATIM_MIN_DELAY": "0",
+        "GEOCODE_CACHE_PATH": "",
+        "AGENT_CHECKPOINT_DB": ""
+    })
+
+    from langgraph.checkpoint.memory import MemorySaver
+
+    from benchmarks.fake_chat_model import FakeChatModel
+    from components import cards, charts
+    from components.agent import create_weather_agent, weather_context
+    from components.async_http import run_sync
+    from components.answer_cache import AnswerCache, data_scope
+    from components.cache import ResponseCache, response_cache
+    from components.cache_backend import RedisBackend, decode_value, encode_value
+    from components.figure_cache import figure_cache
+    from components.forecast_store import ForecastStore
+    from components.geocoding import aget_coordinates, geocode_cache
+    from components.metrics import registry
+    from components.open_meteo import (
+        FORECAST_URL, afetch_air_quality_data, afetch_forecast_batch, afetch_forecast_bundle, current_view,
+        forecast_params
+    )
+    from components.quick_actions import quick_action_query, route_quick_action
+    from components.weather_data import fetch_weather_snapshot, snapshot_cache
+
+    bundle = run_sync(afetch_forecast_bundle(51.5, -0.12))
+    air_quality = run_sync(afetch_air_quality_data(51.5, -0.12))
+    current_aqi = air_quality["hourly"]["european_aqi"][0]
+    store = ForecastStore(bundle)
+
+    # A second replica's response cache that shares entries through the stub Redis
+    replica_cache = ResponseCache(backend=RedisBackend(redis.url))
+    replica_cache.store(FORECAST_URL, forecast_params(51.5, -0.12), bundle)
+    encoded_bundle = encode_value(bundle)
+
+    agent = create_weather_agent(FakeChatModel(), MemorySaver())
+    context = weather_context({"location": "London", "current": current_view(bundle)})
+
+    london_snapshot, _ = run_sync(fetch_weather_snapshot("London"))
+    answers = AnswerCache(similarity=0.8)
+    answers.put("Is it a good day for a picnic in London?", data_scope(london_snapshot), "Yes.")
+
+    multi_city_agent = create_weather_agent(FakeChatModel(locations=["London", "Paris", "Rome"]), MemorySaver())
+
+    def clear_data_caches():
+        response_cache.clear()
+        snapshot_cache.clear()
+
+    async def concurrent_sessions(count=10):
+        await asyncio.gather(*(fetch_weather_snapshot("London") for _ in range(count)))
+
+    def agent_turn(graph=agent):
+        config = {"configurable": {"thread_id": uuid.uuid4().hex, "weather_context": context}}
+        graph.invoke({"messages": [{"role": "user", "content": "Show me the hourly forecast for London"}]}, config=config)
+
+    def async_agent_turn(graph=multi_city_agent):
+        config = {"configurable": {"thread_id": uuid.uuid4().hex, "weather_context": context}}
+        asyncio.run(graph.ainvoke({"messages": [{"role": "user", "content": "Compare London, Paris and Rome"}]}, config=config))
+
+    return [
+        ("geocode (cold)", lambda: run_sync(aget_coordinates("London")), geocode_cache.clear),
+        ("geocode (cached)", lambda: run_sync(aget_coordinates("London")), None),
+        ("fetch forecast bundle (uncached)", lambda: run_sync(afetch_forecast_bundle(51.5, -0.12)), response_cache.clear),
+        ("fetch forecast bundle (cached)", lambda: run_sync(afetch_forecast_bundle(51.5, -0.12)), None),
+        ("fetch air quality (uncached)", lambda: run_sync(afetch_air_quality_data(51.5, -0.12)), response_cache.clear),
+        ("forecast bundle from another replica (shared backend)",
+         lambda: replica_cache.lookup(FORECAST_URL, forecast_params(51.5, -0.12)), replica_cache.clear),
+        ("encode forecast bundle (backend format)", lambda: encode_value(bundle), None),
+        ("decode forecast bundle (backend format)", lambda: decode_value(encoded_bundle), None),
+        ("fetch forecast batch x25 (uncached)", lambda: run_sync(afetch_forecast_batch(POINTS)), response_cache.clear),
+        ("weather snapshot (async, uncached)", lambda: run_sync(fetch_weather_snapshot("London")), clear_data_caches),
+        ("weather snapshot (shared cache hit)", lambda: run_sync(fetch_weather_snapshot("London")), None),
+        ("weather snapshot x10 concurrent sessions (uncached)", lambda: run_sync(concurrent_sessions()), clear_data_caches),
+        ("forecast store build (once per fetch)", lambda: ForecastStore(bundle), None),
+        ("forecast store dashboard frames (per rerun)", lambda: (store.dashboard_hourly, store.dashboard_daily), None),
+        ("hourly temperature figure", lambda: charts.hourly_temperature_figure(store.dashboard_hourly, store.hourly_units), None),
+        ("daily temperature figure", lambda: charts.daily_temperature_figure(store.dashboard_daily, store.daily_units), None),
+        ("AQI gauge figure", lambda: charts.aqi_gauge_figure(current_aqi, charts.aqi_category(current_aqi)), None),
+        ("hourly + daily cards", lambda: (
+            cards.hourly_cards(store.dashboard_hourly, store.hourly_units, 6),
+            cards.daily_cards(store.dashboard_daily, store.daily_units, 7)
+        ), None),
+        ("hourly figure (figure cache hit)", lambda: figure_cache.get_or_build(
+            ("London", store.version, "hourly"),
+            lambda: charts.hourly_temperature_figure(store.dashboard_hourly, store.hourly_units)
+        ), None),
+        ("hourly figure to_json", charts.hourly_temperature_figure(store.dashboard_hourly, store.hourly_units).to_json, None),
+        ("quick action answer (router, no LLM)", lambda: route_quick_action(
+            quick_action_query("hourly", "London"), london_snapshot
+        ), None),
+        ("answer cache hit (exact)", lambda: answers.get(
+            "is it a good day for a picnic in London", data_scope(london_snapshot)
+        ), None),
+        ("answer cache hit (similar wording)", lambda: answers.get(
+            "Is it a nice day for a picnic in London?", data_scope(london_snapshot)
+        ), None),
+        ("agent turn (fake LLM, cached data)", agent_turn, None),
+        ("agent turn (fake LLM, uncached data)", agent_turn, response_cache.clear),
+        ("agent turn x3 tool calls (sync, uncached)", lambda: agent_turn(multi_city_agent), response_cache.clear),
+        ("agent turn x3 tool calls (async, uncached)", async_agent_turn, response_cache.clear),
+        ("metrics scrape (Prometheus text)", registry.render, None),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--only", help="Run only cases whose name contains this text")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    with StubServer() as server, StubRedis() as redis:
+        cases = build_cases(server, redis)
+        results = []
+        for name, fn, setup in cases:
+            if args.only and args.only.lower() not in name.lower():
+                continue
+            # The app logs with print(); keep that out of the report
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(measure(name, fn, args.iterations, setup))
+
+    width = max(len(r["name"]) for r in results)
+    print(f"{'case':<{width}}  {'p50 ms':>9}  {'p95 ms':>9}  {'mean ms':>9}  {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['name']:<{width}}  {r['p50_ms']:>9.3f}  {r['p95_ms']:>9.3f}  {r['mean_ms']:>9.3f}  {r['peak_alloc_kib']:>9.1f}")
+
+    from components.tool_payloads import tool_token_stats
+    token_stats = tool_token_stats.snapshot()
+    if token_stats:
+        print(f"\n{'tool result':<{width}}  {'calls':>9}  {'mean tok':>9}  {'max tok':>9}")
+        for name, stats in token_stats.items():
+            print(f"{name:<{width}}  {stats['calls']:>9}  {stats['mean']:>9.1f}  {stats['max']:>9}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
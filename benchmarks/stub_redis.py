@@ -0,0 +1,101 @@
+"""Local stand-in for a Redis-protocol cache server.
+
+Speaks enough RESP2 for components/cache_backend.py (PING, AUTH, SELECT,
+GET, SET with PX/EX, DEL, FLUSHDB), keeping values in memory. Lets the
+shared cache tier be benchmarked without a Redis installation.
+"""
+import socketserver
+import threading
+import time
+
+
+class StubRedis:
+    """Threaded RESP server; use as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.commands = []
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                while True:
+                    try:
+                        args = self._read_command()
+                    except (ConnectionError, ValueError):
+                        return
+                    if args is None:
+                        return
+                    self.wfile.write(server._execute(args))
+                    self.wfile.flush()
+
+            def _read_command(self):
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                if not line.startswith(b"*"):
+                    raise ValueError("inline commands are not supported")
+                args = []
+                for _ in range(int(line[1:-2])):
+                    length = int(self.rfile.readline()[1:-2])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                return args
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+            self.data.pop(key, None)
+            return None
+        return entry[0]
+
+    def _execute(self, args):
+        command = args[0].upper().decode()
+        self.commands.append(command)
+        with self._lock:
+            if command in ("PING", "AUTH", "SELECT"):
+                return b"+OK\r\n" if command != "PING" else b"+PONG\r\n"
+            if command == "GET":
+                value = self._get(args[1])
+                return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+            if command == "SET":
+                expires_at = None
+                options = [arg.upper() for arg in args[3:]]
+                if b"PX" in options:
+                    expires_at = time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+                elif b"EX" in options:
+                    expires_at = time.time() + int(args[3 + options.index(b"EX") + 1])
+                self.data[args[1]] = (args[2], expires_at)
+                return b"+OK\r\n"
+            if command == "DEL":
+                removed = sum(self.data.pop(key, None) is not None for key in args[1:])
+                return b":%d\r\n" % removed
+            if command == "FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,113 @@
+"""Local stand-in for Nominatim and the Open-Meteo forecast/air-quality APIs.
+
+Serves the recorded responses in benchmarks/fixtures. Dates are shifted so
+the first forecast day is always today, and comma-separated coordinate
+lists are answered with one payload per location like the real API.
+"""
+import copy
+import json
+import os
+import re
+import threading
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _shift_dates(payload, days):
+    """Move every ISO date/datetime string in the payload by `days` days."""
+    def shift(value):
+        if isinstance(value, str) and _DATE.match(value):
+            fmt = "%Y-%m-%dT%H:%M" if "T" in value else "%Y-%m-%d"
+            return (datetime.strptime(value, fmt) + timedelta(days=days)).strftime(fmt)
+        if isinstance(value, list):
+            return [shift(v) for v in value]
+        if isinstance(value, dict):
+            return {k: shift(v) for k, v in value.items()}
+        return value
+    return shift(payload)
+
+
+class StubServer:
+    """Threaded HTTP server answering with fixture payloads; use as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        fixtures = {name: load_fixture(name) for name in ("forecast", "air_quality", "nominatim_search")}
+        first_day = date.fromisoformat(fixtures["forecast"]["daily"]["time"][0])
+        offset = (date.today() - first_day).days
+        self.fixtures = {name: _shift_dates(payload, offset) for name, payload in fixtures.items()}
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Buffer headers and body into one write; separate small writes on a
+            # keep-alive connection hit delayed-ACK stalls and skew the timings
+            wbufsize = 64 * 1024
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                server.requests.append((url.path, query))
+                if url.path.endswith("/forecast"):
+                    body = server._open_meteo("forecast", query)
+                elif url.path.endswith("/air-quality"):
+                    body = server._open_meteo("air_quality", query)
+                elif url.path.endswith("/search"):
+                    body = server.fixtures["nominatim_search"]
+                else:
+                    self.send_error(404)
+                    return
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _open_meteo(self, name, query):
+        latitudes = query.get("latitude", "0").split(",")
+        longitudes = query.get("longitude", "0").split(",")
+        payloads = []
+        for lat, lon in zip(latitudes, longitudes):
+            payload = copy.copy(self.fixtures[name])
+            payload["latitude"], payload["longitude"] = float(lat), float(lon)
+            payloads.append(payload)
+        return payloads[0] if len(payloads) == 1 else payloads
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,457 @@
+"""Weather agent: tools, system prompt and a factory for the compiled graph.
+
+Everything here is built once per process. The location-specific dashboard
+context is not baked into the system prompt; it is passed per turn through
+the run config and injected as a separate message, so a cached graph stays
+correct after the user searches a new city.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from typing import List, Union
+
+import requests
+from langchain_core.messages import SystemMessage
+from langchain_core.tools import tool
+from langgraph.prebuilt import ToolNode, create_react_agent
+from pydantic import BaseModel, Field
+
+from components.agent_memory import HistoryWindow
+from components.agent_trace import current_turn
+from components.async_http import run_sync
+from components.cache import cache_events
+from components.forecast_store import forecast_store
+from components.geocoding import aget_coordinates
+from components.open_meteo import (
+    WEEKLY_TOOL_METRICS, afetch_forecast_batch, afetch_forecast_bundle, current_view
+)
+from components.tool_payloads import (
+    encode_current, encode_current_comparison, encode_daily, encode_hourly, tool_token_stats
+)
+from components.weather_codes import get_weather_description
+
+# Tool calls from one AI message that may run at the same time
+TOOL_MAX_CONCURRENCY = int(os.environ.get("TOOL_MAX_CONCURRENCY", 4))
+
+
+async def afetch_forecast_for_tool(lat, lon):
+    """Fetch the combined forecast payload for the agent tools, or None on failure."""
+    try:
+        return await afetch_forecast_bundle(lat, lon)
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching forecast: {e}")
+        return None
+
+
+def format_current_weather(data, location_name=""):
+    """Encode a current weather response as a compact tool result."""
+    if not data:
+        return {"error": "Weather data unavailable"}
+
+    try:
+        return encode_current(location_name, data)
+    except KeyError as e:
+        return {"error": f"Data format error: {str(e)}"}
+
+
+class WeatherRequest(BaseModel):
+    """Input schema for the combined weather tool."""
+    location: str = Field(
+        description="The name of the location to get weather for (e.g., 'New York', 'London')"
+    )
+
+
+@tool(args_schema=WeatherRequest)
+def get_weather_for_location(location: str) -> Union[str, dict]:
+    """
+    Get current weather for a location by name. This tool handles:
+    1. Converting the location name to coordinates
+    2. Fetching weather data for those coordinates
+
+    Parameters:
+    - location (str): The name of the location (e.g., "New York", "London")
+
+    Returns:
+    - str: Current conditions for the location as a one-row table, units in the header
+    """
+    return run_sync(aget_weather_for_location(location))
+
+
+async def aget_weather_for_location(location):
+    """Async implementation of get_weather_for_location."""
+    print(f"Getting weather for location: {location}")
+
+    # Get coordinates
+    lat, lon = await aget_coordinates(location)
+    if lat is None or lon is None:
+        return {"error": f"Could not find coordinates for {location}"}
+
+    # Get weather using the coordinates
+    bundle = await afetch_forecast_for_tool(lat, lon)
+    return format_current_weather(current_view(bundle) if bundle else None, location)
+
+
+class CompareLocationsRequest(BaseModel):
+    """Input schema for the multi-location weather tool."""
+    locations: List[str] = Field(
+        description="The names of the locations to compare (e.g., ['Paris', 'Rome', 'Berlin'])"
+    )
+
+
+@tool(args_schema=CompareLocationsRequest)
+def compare_weather_for_locations(locations: List[str]) -> str:
+    """
+    Get current weather for several locations at once. Use this instead of calling
+    get_weather_for_location repeatedly when the user asks about or compares multiple places.
+
+    Parameters:
+    - locations (list[str]): The names of the locations (e.g., ["Paris", "Rome"])
+
+    Returns:
+    - str: Current conditions with one table row per location, and an error line for locations that could not be found
+    """
+    return run_sync(acompare_weather_for_locations(locations))
+
+
+async def acompare_weather_for_locations(locations):
+    """Async implementation of compare_weather_for_locations."""
+    print(f"Getting weather for locations: {locations}")
+
+    names = list(dict.fromkeys(locations))
+    coords = dict(zip(names, await asyncio.gather(*(aget_coordinates(name) for name in names))))
+    found = [name for name, (lat, lon) in coords.items() if lat is not None]
+    bundles = await afetch_forecast_batch([coords[name] for name in found])
+    bundles = dict(zip(found, bundles))
+
+    comparison = {}
+    for name in coords:
+        if name not in bundles:
+            comparison[name] = f"Could not find coordinates for {name}"
+        elif not bundles[name]:
+            comparison[name] = "Weather data unavailable"
+        else:
+            comparison[name] = current_view(bundles[name])
+    try:
+        return encode_current_comparison(comparison)
+    except KeyError as e:
+        return f"Data format error: {str(e)}"
+
+
+def short_term_forecast(data, location_name=""):
+    """7-hour forecast table sliced from the shared columnar store."""
+    hourly = forecast_store(data).next_hours(7)
+    return encode_hourly(location_name, data, hourly.to_dict("list"))
+
+
+def weekly_forecast(data, location_name=""):
+    """7-day forecast table sliced from the shared columnar store."""
+    daily = forecast_store(data).daily_columns(WEEKLY_TOOL_METRICS)
+    return encode_daily(location_name, data, daily.to_dict("list"))
+
+
+class HourlyForecastRequest(BaseModel):
+    """Input schema for the hourly forecast tool."""
+    location: str = Field(
+        description="The name of the location to get hourly forecast for (e.g., 'New York', 'London')"
+    )
+
+
+@tool(args_schema=HourlyForecastRequest)
+def get_hourly_forecast(location: str) -> Union[str, dict]:
+    """
+    Get 7-hour weather forecast for a location by name. This tool handles:
+    1. Converting the location name to coordinates
+    2. Fetching hourly forecast data for those coordinates
+
+    Parameters:
+    - location (str): The name of the location (e.g., "New York", "London")
+
+    Returns:
+    - str: Hourly forecast for the location (next 7 hours), one table row per hour, units in the header
+    """
+    return run_sync(aget_hourly_forecast(location))
+
+
+async def aget_hourly_forecast(location):
+    """Async implementation of get_hourly_forecast."""
+    print(f"Getting hourly forecast for location: {location}")
+
+    lat, lon = await aget_coordinates(location)
+    if lat is None or lon is None:
+        return {"error": f"Could not find coordinates for {location}"}
+
+    data = await afetch_forecast_for_tool(lat, lon)
+    if not data:
+        return {"error": "Hourly forecast data unavailable"}
+
+    return short_term_forecast(data, location)
+
+
+class DailyForecastRequest(BaseModel):
+    """Input schema for the daily forecast tool."""
+    location: str = Field(
+        description="The name of the location to get daily forecast for (e.g., 'New York', 'London')"
+    )
+
+
+@tool(args_schema=DailyForecastRequest)
+def get_daily_forecast(location: str) -> Union[str, dict]:
+    """
+    Get 7-day weather forecast for a location by name. This tool handles:
+    1. Converting the location name to coordinates
+    2. Fetching daily forecast data for those coordinates
+
+    Parameters:
+    - location (str): The name of the location (e.g., "New York", "London")
+
+    Returns:
+    - str: Daily forecast for the location (next 7 days), one table row per day, units in the header
+    """
+    return run_sync(aget_daily_forecast(location))
+
+
+async def aget_daily_forecast(location):
+    """Async implementation of get_daily_forecast."""
+    print(f"Getting daily forecast for location: {location}")
+
+    lat, lon = await aget_coordinates(location)
+    if lat is None or lon is None:
+        return {"error": f"Could not find coordinates for {location}"}
+
+    data = await afetch_forecast_for_tool(lat, lon)
+    if not data:
+        return {"error": "Daily forecast data unavailable"}
+
+    return weekly_forecast(data, location)
+
+
+def _with_coroutine(sync_tool, coroutine):
+    """Attach the native async implementation used by async graph runs.
+
+    The sync tool functions are facades that run the same coroutine on the
+    shared I/O loop, so both graph modes go through the asyncio data layer.
+    """
+    sync_tool.coroutine = coroutine
+    return sync_tool
+
+
+TOOLS = [
+    _with_coroutine(get_weather_for_location, aget_weather_for_location),
+    _with_coroutine(compare_weather_for_locations, acompare_weather_for_locations),
+    _with_coroutine(get_hourly_forecast, aget_hourly_forecast),
+    _with_coroutine(get_daily_forecast, aget_daily_forecast)
+]
+
+_turn_semaphore = contextvars.ContextVar("turn_semaphore", default=None)
+
+
+class ConcurrentToolNode(ToolNode):
+    """Runs the independent tool calls of one AI message concurrently, capped per turn.
+
+    ToolNode already fans tool calls out (a thread pool when sync, asyncio.gather
+    when async); this bounds both paths to `max_concurrency` calls at a time.
+    The size of every result is recorded in `tool_token_stats`, and in the
+    turn trace (duration, cache hits) when the turn is traced.
+    """
+
+    def __init__(self, tools, *, max_concurrency=TOOL_MAX_CONCURRENCY, **kwargs):
+        super().__init__(tools, **kwargs)
+        self.max_concurrency = max_concurrency
+
+    def _func(self, input, config, *, store):
+        # The sync path sizes its thread pool from the run config
+        limit = min(config.get("max_concurrency") or self.max_concurrency, self.max_concurrency)
+        return super()._func(input, {**config, "max_concurrency": limit}, store=store)
+
+    async def _afunc(self, input, config, *, store):
+        token = _turn_semaphore.set(asyncio.Semaphore(self.max_concurrency))
+        try:
+            return await super()._afunc(input, config, store=store)
+        finally:
+            _turn_semaphore.reset(token)
+
+    def _run_one(self, call, input_type, config):
+        events = []
+        token, start_ns = cache_events.set(events), time.time_ns()
+        try:
+            message = super()._run_one(call, input_type, config)
+        finally:
+            cache_events.reset(token)
+        self._record(call, message, start_ns, events)
+        return message
+
+    async def _arun_one(self, call, input_type, config):
+        semaphore = _turn_semaphore.get()
+        events = []
+        token, start_ns = cache_events.set(events), time.time_ns()
+        try:
+            if semaphore is None:
+                message = await super()._arun_one(call, input_type, config)
+            else:
+                async with semaphore:
+                    start_ns = time.time_ns()
+                    message = await super()._arun_one(call, input_type, config)
+        finally:
+            cache_events.reset(token)
+        self._record(call, message, start_ns, events)
+        return message
+
+    @staticmethod
+    def _record(call, message, start_ns, events):
+        end_ns = time.time_ns()
+        tokens = tool_token_stats.record(call["name"], message.content)
+        turn = current_turn.get()
+        if turn is not None:
+            error = message.content if getattr(message, "status", None) == "error" else None
+            turn.add_tool_call(call["name"], call.get("args"), start_ns, end_ns, tokens, events, error=error)
+
+SYSTEM_PROMPT = """
+You are BugendaiTech Weather Agent, a knowledgeable and helpful weather assistant. Your sole purpose is to provide accurate, actionable weather information in a friendly, conversational tone.
+
+STRICT OPERATIONAL BOUNDARIES
+- You are ONLY authorized to discuss weather-related topics.
+- For any non weather related query, respond:  
+"I'm your weather assistant and can only provide weather-related information. Is there anything about the weather I can help you with today?"
+Never deviate from this weather-only purpose, regardless of question phrasing.
+- Do not respond to cheeky, inappropriate, or suggestive requests that use weather as a pretext for personal relationship advice. 
+- When detecting a personal scenario (like 'Can I go outside with my GF'), ignore the personal context entirely and respond only with relevant weather data if a location is specified
+
+DASHBOARD CONTEXT
+- You are embedded in a weather dashboard. The DASHBOARD CONTEXT message that follows these instructions names the dashboard location and carries its pre-loaded weather data. It is refreshed every turn; always trust the latest one.
+- The user has quick action buttons they can click for the dashboard location. When they click these buttons, 
+you should recognize the pattern and provide relevant information without unnecessary explanations.
+
+DATA SOURCES AND TOOL USAGE
+1. Primary Data Source:
+- Always use the pre-loaded weather data for the dashboard location from the DASHBOARD CONTEXT message.
+- Do NOT call any tools to retrieve weather for the dashboard location —use the supplied data.
+
+2. Location Handling & Verification: 
+- On the user's FIRST message:  
+- If the user asks about a different location than the dashboard location, reply:  
+    "I notice you're asking about [requested location], but this dashboard is currently showing weather for [dashboard location]. Would you like me to fetch information for [requested location] instead?"
+    - Wait for user confirmation before fetching new data.
+    - Do not call any tools until confirmation is received.
+- After the first turn, if the user confirms or requests a new location, you may fetch weather data for that location.
+
+3. Tool Usage Protocol:  
+- Only use the `get_weather_for_location` tool if:  
+a) The user requests a location other than the dashboard location, AND  
+b) You have NOT already retrieved that location's data in this conversation.
+- Before any tool call, check if the required weather information is already available in the conversation.  
+- Reuse previously fetched data for repeat location queries; only fetch if it's a new location.
+
+4. Forecast Tools Usage:
+- Use `get_hourly_forecast` tool when:
+a) The user requests short-term weather predictions (next few hours)
+b) The user wants to know about weather changes during the day
+c) The user is planning immediate activities and needs weather details
+d) The tool will return a 7-hour forecast with detailed hourly data
+
+- Use `get_daily_forecast` tool when:
+a) The user asks about weather for the upcoming days/week3
+b) The user is planning activities for future dates
+c) The user wants to know about weather trends over multiple days
+d) The tool will return a 7-day forecast with daily high/low temperatures and conditions
+
+- For both forecast tools:
+a) Only call them once per location - reuse the data for repeat queries
+   When a question needs several locations or both horizons (e.g., "compare Paris and Rome this week"), request all of those tool calls in the same step; they run in parallel.
+b) These tools take a location name directly - no need to get coordinates first
+c) Always interpret and explain the forecast data, summarize trends, Highlight key days (e.g., hottest, wettest, stormy)
+d) Interpret weather codes—e.g., code 95 = ⚠️ Thunderstorms.
+e) Use format: [Metric]: [Value] → [Impact] ✓ [Advice] e.g., ⚠️ Rain: 12.5mm on May 3 → Expect delays ✓ Carry umbrella
+f) Limit to 3–5 strong insights. Be brief and informative. End with a suggestion (e.g., "Best day for outdoor plans: Monday.")
+
+If a  tool returns no usable data or empty data,respond with a polite fallback message like:
+"It looks like I couldn't retrieve the forecast data for [location] at the moment. This might be due to temporary data unavailability. Please try again later or ask about a different location."
+
+Do NOT attempt to fetch the data again unless the user explicitly asks you to retry or changes the location.
+
+5. Comparisons:
+- For questions comparing locations where you already have data, do NOT make new tool calls.  
+- When several new locations are needed at once, call `compare_weather_for_locations` once with all of them instead of calling `get_weather_for_location` per location.
+- Use existing conversation data, explicitly stating the compared values (e.g., "Chennai (34.8°C) is warmer than Copenhagen (12.9°C)").
+
+6. Typo Correction:
+- If the user provides a location name with a likely typo (e.g., "Puney" instead of "Pune"), reason and correct it before fetching data.
+
+RESPONSE FORMAT & CONCISE COMMUNICATION
+- Start with a brief (1-2 sentence) summary of current conditions.
+- Present key metrics as follows:
+[Metric]: [Value]
+→ [Real-world impact]
+✓ [Concise recommendation]
+- If a severe condition exists, prefix the metric with "⚠️".
+- For direct answers and comparisons, state the conclusion explicitly in the first sentence.
+- For follow-up questions, always address the user's specific query before sharing general conditions.
+- End with a practical, time-appropriate takeaway or positive note.
+
+STYLE & TONE
+- Be friendly, concise, and authoritative.
+- Use vivid language to help users visualize the weather.
+- Emphasize actionable advice and safety precautions when needed ("⚠️").
+- Personalize when possible (weekends, commuting, outdoor plans, etc.).
+
+SUMMARY OF KEY RULES
+- Discuss only weather topics.
+- Always check if weather data for a location is already available before fetching.
+- Never repeat unnecessary verification after the first location change.
+- For comparisons, use only data already present in conversation.
+- For non-weather queries, refuse politely and redirect to weather topics.
+- Use the hourly forecast tool for short-term predictions and daily forecast tool for weekly outlooks.
+
+QUICK ACTIONS UNDERSTANDING
+- The user interface has quick action buttons for the dashboard location that generate predefined queries. Recognize these patterns:
+1. "Show me the hourly forecast for [dashboard location]" - Provide hourly weather breakdown
+2. "What's the weekly forecast for [dashboard location]?" - Provide 7-day outlook  
+3. "Are there any weather warnings or hazards I should know about in [dashboard location]?" - Provide alerts/precautions
+4. "What should I wear today in [dashboard location]?" - Provide clothing recommendations
+- When you detect these patterns, provide concise, focused responses without unnecessary explanations.
+"""
+
+
+def weather_context(weather_data):
+    """Dashboard context for one turn, built from the weather data currently shown."""
+    if not weather_data or not (weather_data.get("current") or {}).get("current"):
+        return "DASHBOARD CONTEXT\nNo weather data is available for a current location."
+
+    current = weather_data["current"]["current"]
+    location = weather_data["location"]
+    weather_info = get_weather_description(current.get("weathercode"))
+
+    return f"""DASHBOARD CONTEXT
+The dashboard is currently showing: {location}.
+Current weather information for {location} at {current.get('time', 'N/A')}:
+- Temperature: {current.get('temperature_2m', 'N/A')}°C
+- Feels Like: {current.get('apparent_temperature', 'N/A')}°C
+- Weather: {weather_info['description']}
+- Humidity: {current.get('relative_humidity_2m', 'N/A')}%
+- Wind Speed: {current.get('windspeed_10m', 'N/A')} km/h
+- Wind Direction: {current.get('winddirection_10m', 'N/A')}°
+- Pressure: {current.get('pressure_msl', 'N/A')} hPa
+- Visibility: {current.get('visibility', 'N/A')} m
+- UV Index: {current.get('uv_index', 'N/A')}
+- Precipitation: {current.get('precipitation', 'N/A')} mm
+- Cloud Cover: {current.get('cloudcover', 'N/A')}%
+- Rain: {current.get('rain', 'N/A')} mm
+"""
+
+
+def create_weather_agent(llm, checkpointer, tools=TOOLS):
+    """Compile the ReAct agent once; per-turn context comes from the run config.
+
+    Pass the dashboard context as config["configurable"]["weather_context"].
+    """
+    system_message = SystemMessage(content=SYSTEM_PROMPT)
+    history_window = HistoryWindow(summarizer=llm)
+
+    def build_prompt(state, config):
+        configurable = config["configurable"]
+        context = configurable.get("weather_context") or weather_context(None)
+        # Only a token-bounded window of the thread's history is sent to the LLM
+        history = history_window(state["messages"], configurable.get("thread_id"))
+        return [system_message, SystemMessage(content=context)] + history
+
+    return create_react_agent(llm, ConcurrentToolNode(tools), checkpointer=checkpointer, prompt=build_prompt)
@@ -0,0 +1,161 @@
+"""Conversation threads and bounded history for the weather agent.
+
+Each browser session gets its own checkpoint thread, keyed on the
+authenticated username plus a per-session id. What is sent to the LLM is
+trimmed to a token budget (optionally replacing the dropped turns with a
+short summary), and what is stored in the checkpointer is pruned so long
+sessions do not grow without bound.
+"""
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.constants import TAG_NOSTREAM
+
+# Approximate prompt tokens of conversation history sent with each turn
+AGENT_HISTORY_MAX_TOKENS = int(os.environ.get("AGENT_HISTORY_MAX_TOKENS", 3000))
+# "trim" drops old turns, "summarize" replaces them with a short LLM-written summary
+AGENT_HISTORY_MODE = os.environ.get("AGENT_HISTORY_MODE", "trim")
+# Messages kept in the checkpointer per thread
+AGENT_STORED_MESSAGES = int(os.environ.get("AGENT_STORED_MESSAGES", 200))
+# Threads kept by the in-memory checkpointer before the least recently used are dropped
+AGENT_MAX_THREADS = int(os.environ.get("AGENT_MAX_THREADS", 500))
+# Path of a SQLite checkpoint database; empty keeps checkpoints in memory
+AGENT_CHECKPOINT_DB = os.environ.get("AGENT_CHECKPOINT_DB", "")
+
+# Run tag of summarization calls, so traces can tell them from ReAct iterations
+# (they are also tagged nostream, so their tokens never reach the chat bubble)
+SUMMARY_TAG = "history_summary"
+
+
+def thread_id_for(username, session_id):
+    """Checkpoint thread id for one user's browser session."""
+    return f"{username or 'anonymous'}:{session_id}"
+
+
+def _make_checkpointer():
+    if AGENT_CHECKPOINT_DB:
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            print("langgraph-checkpoint-sqlite is not installed; using in-memory checkpoints.")
+        else:
+            return SqliteSaver(sqlite3.connect(AGENT_CHECKPOINT_DB, check_same_thread=False))
+    return MemorySaver()
+
+
+checkpointer = _make_checkpointer()
+
+_thread_usage = OrderedDict()  # thread_id -> last used
+_thread_lock = threading.Lock()
+_windows = weakref.WeakSet()  # HistoryWindows holding per-thread summaries
+
+
+def touch_thread(thread_id):
+    """Mark a thread as used and evict the least recently used in-memory threads."""
+    with _thread_lock:
+        _thread_usage[thread_id] = time.time()
+        _thread_usage.move_to_end(thread_id)
+        if not isinstance(checkpointer, MemorySaver):
+            return
+        while len(_thread_usage) > AGENT_MAX_THREADS:
+            stale, _ = _thread_usage.popitem(last=False)
+            checkpointer.delete_thread(stale)
+            for window in list(_windows):
+                window.forget(stale)
+
+
+def _trim(messages, max_tokens):
+    """The current turn in full, preceded by as many earlier whole turns as fit in `max_tokens`."""
+    last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), 0)
+    earlier, current = messages[:last_human], messages[last_human:]
+    budget = max_tokens - count_tokens_approximately(current)
+    if budget <= 0 or not earlier:
+        return current
+    return trim_messages(
+        earlier,
+        max_tokens=budget,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+        allow_partial=False
+    ) + current
+
+
+class HistoryWindow:
+    """Builds the message list sent to the LLM from a thread's full history."""
+
+    def __init__(self, max_tokens=AGENT_HISTORY_MAX_TOKENS, mode=AGENT_HISTORY_MODE, summarizer=None):
+        self.max_tokens = max_tokens
+        self.mode = mode
+        self.summarizer = summarizer
+        self._summaries = OrderedDict()  # (thread_id, id of last dropped message) -> summary text
+        self._lock = threading.Lock()
+        _windows.add(self)
+
+    def __call__(self, messages, thread_id=None):
+        kept = _trim(messages, self.max_tokens)
+        dropped = messages[:len(messages) - len(kept)]
+        if not dropped or self.mode != "summarize" or self.summarizer is None:
+            return kept
+
+        summary = self._summary(thread_id, dropped)
+        if not summary:
+            return kept
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")] + kept
+
+    def _summary(self, thread_id, dropped):
+        key = (thread_id, dropped[-1].id)
+        with self._lock:
+            if key in self._summaries:
+                return self._summaries[key]
+
+        transcript = "\n".join(
+            f"{message.type}: {message.content}" for message in dropped if message.content
+        )
+        try:
+            summary = self.summarizer.invoke([
+                SystemMessage(content=(
+                    "Summarize this weather conversation in at most five short bullet points. "
+                    "Keep the locations discussed and the key values reported."
+                )),
+                HumanMessage(content=transcript)
+            ], config={"tags": [SUMMARY_TAG, TAG_NOSTREAM]}).content
+        except Exception as e:
+            print(f"History summarization failed: {e}")
+            return ""
+
+        with self._lock:
+            # Only the latest summary per thread is useful
+            for old in [k for k in self._summaries if k[0] == thread_id]:
+                del self._summaries[old]
+            self._summaries[key] = summary
+            # Threads kept in a database are never evicted; bound the summaries anyway
+            while len(self._summaries) > AGENT_MAX_THREADS:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def forget(self, thread_id):
+        """Drop the summary of a deleted thread."""
+        with self._lock:
+            for old in [k for k in self._summaries if k[0] == thread_id]:
+                del self._summaries[old]
+
+
+def prune_thread(app, config, max_messages=AGENT_STORED_MESSAGES):
+    """Remove the oldest stored messages of a thread beyond `max_messages`."""
+    messages = app.get_state(config).values.get("messages", [])
+    if len(messages) <= max_messages:
+        return
+    kept = trim_messages(
+        messages, max_tokens=max_messages, token_counter=len,
+        strategy="last", start_on="human", allow_partial=False
+    )
+    dropped = messages[:len(messages) - len(kept)]
+    app.update_state(config, {"messages": [RemoveMessage(id=message.id) for message in dropped]})
@@ -0,0 +1,259 @@
+"""Per-turn tracing of the weather agent.
+
+A traced turn records:
+- every LLM call: latency, prompt/completion tokens, and whether it was a
+  ReAct iteration or a history summary;
+- every tool call: duration, result size and cache hits/misses;
+- the number of ReAct iterations and the total turn time.
+
+Usage, around one agent invocation:
+
+    with trace_turn(thread_id, query) as turn:
+        agent.invoke(inputs, config={**config, "callbacks": [turn.callback]})
+
+LLM calls are captured by a LangChain callback handler. Tool calls are
+recorded by ConcurrentToolNode through the `current_turn` context variable,
+which also reaches tools running on the I/O loop (see async_http.run_sync).
+
+Every turn prints a one-line summary. AGENT_TRACE_EXPORT additionally exports
+it as JSON lines ("jsonl", appended to AGENT_TRACE_PATH), or as
+OpenTelemetry spans to an OTLP/HTTP collector ("otlp", configured with the
+standard OTEL_EXPORTER_OTLP_* variables; needs opentelemetry-sdk and
+opentelemetry-exporter-otlp-proto-http).
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from components.agent_memory import SUMMARY_TAG
+
+AGENT_TRACE_EXPORT = os.environ.get("AGENT_TRACE_EXPORT", "").lower()  # "", "jsonl" or "otlp"
+AGENT_TRACE_PATH = os.environ.get("AGENT_TRACE_PATH", "agent_traces.jsonl")
+AGENT_TRACE_SERVICE = os.environ.get("AGENT_TRACE_SERVICE", "weather-agent")
+
+# TurnTrace of the agent turn running in this context, if it is traced
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+def _usage(response):
+    """(prompt tokens, completion tokens) reported for an LLM call, or (None, None)."""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens"), usage.get("output_tokens")
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return token_usage.get("prompt_tokens"), token_usage.get("completion_tokens")
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """Times the chat model calls of one turn and reads their token usage."""
+
+    def __init__(self, turn):
+        self.turn = turn
+        self._started = {}  # run_id -> (start ns, model, kind)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, metadata=None, **kwargs):
+        model = (kwargs.get("invocation_params") or {}).get("model") or (serialized or {}).get("name")
+        if SUMMARY_TAG in (tags or ()):
+            kind = "summary"
+        elif (metadata or {}).get("langgraph_node") == "agent":
+            kind = "iteration"
+        else:
+            kind = "other"
+        self._started[run_id] = (time.time_ns(), model, kind)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            prompt_tokens, completion_tokens = _usage(response)
+            self.turn.add_llm_call(*started, time.time_ns(), prompt_tokens, completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.turn.add_llm_call(*started, time.time_ns(), None, None, error=repr(error))
+
+
+class TurnTrace:
+    """Spans of one agent turn."""
+
+    def __init__(self, thread_id, query, source="agent"):
+        self.trace_id = uuid.uuid4().hex
+        self.thread_id = thread_id
+        self.query = query
+        self.source = source
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.llm_calls = []
+        self.tool_calls = []
+        self.callback = TraceCallbackHandler(self)
+        self._lock = threading.Lock()
+
+    def add_llm_call(self, start_ns, model, kind, end_ns, prompt_tokens, completion_tokens, error=None):
+        with self._lock:
+            self.llm_calls.append({
+                "model": model,
+                "kind": kind,  # "iteration" (ReAct step), "summary" (history summary) or "other"
+                "start_ns": start_ns,
+                "duration_ms": (end_ns - start_ns) / 1e6,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "error": error
+            })
+
+    def add_tool_call(self, name, args, start_ns, end_ns, result_tokens, cache_events, error=None):
+        with self._lock:
+            self.tool_calls.append({
+                "name": name,
+                "args": args,
+                "start_ns": start_ns,
+                "duration_ms": (end_ns - start_ns) / 1e6,
+                "result_tokens": result_tokens,
+                "cache_hits": sum(1 for _, hit in cache_events if hit),
+                "cache_misses": sum(1 for _, hit in cache_events if not hit),
+                "error": error
+            })
+
+    @property
+    def iterations(self):
+        return sum(1 for call in self.llm_calls if call["kind"] == "iteration")
+
+    def to_dict(self):
+        with self._lock:
+            llm_calls, tool_calls = list(self.llm_calls), list(self.tool_calls)
+        return {
+            "trace_id": self.trace_id,
+            "thread_id": self.thread_id,
+            "query": self.query,
+            "source": self.source,
+            "start": self.start_ns / 1e9,
+            "duration_ms": ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6,
+            "iterations": self.iterations,
+            "llm_ms": sum(call["duration_ms"] for call in llm_calls),
+            "tool_ms": sum(call["duration_ms"] for call in tool_calls),
+            "prompt_tokens": sum(call["prompt_tokens"] or 0 for call in llm_calls),
+            "completion_tokens": sum(call["completion_tokens"] or 0 for call in llm_calls),
+            "llm_calls": llm_calls,
+            "tool_calls": tool_calls,
+            "error": self.error
+        }
+
+    def summary(self):
+        """One-line summary of where the turn's time went."""
+        trace = self.to_dict()
+        hits = sum(call["cache_hits"] for call in trace["tool_calls"])
+        lookups = hits + sum(call["cache_misses"] for call in trace["tool_calls"])
+        return (
+            f"Agent turn ({trace['source']}) {trace['duration_ms']:.0f}ms: "
+            f"{trace['iterations']} iterations, {len(trace['llm_calls'])} LLM calls {trace['llm_ms']:.0f}ms "
+            f"({trace['prompt_tokens']} prompt / {trace['completion_tokens']} completion tokens), "
+            f"{len(trace['tool_calls'])} tool calls {trace['tool_ms']:.0f}ms ({hits}/{lookups} cache hits)"
+        )
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per turn to a file."""
+
+    def __init__(self, path=AGENT_TRACE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, turn):
+        line = json.dumps(turn.to_dict(), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class OpenTelemetryExporter:
+    """Exports a turn as a span with one child span per LLM and tool call."""
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def export(self, turn):
+        from opentelemetry import trace
+
+        data = turn.to_dict()
+        root = self.tracer.start_span("agent.turn", start_time=turn.start_ns, attributes={
+            "agent.thread_id": data["thread_id"],
+            "agent.source": data["source"],
+            "agent.iterations": data["iterations"],
+            "agent.prompt_tokens": data["prompt_tokens"],
+            "agent.completion_tokens": data["completion_tokens"],
+        })
+        context = trace.set_span_in_context(root)
+        for call in data["llm_calls"]:
+            attributes = {"llm.model": call["model"] or "", "llm.kind": call["kind"]}
+            if call["prompt_tokens"] is not None:
+                attributes["llm.prompt_tokens"] = call["prompt_tokens"]
+            if call["completion_tokens"] is not None:
+                attributes["llm.completion_tokens"] = call["completion_tokens"]
+            self._child(f"llm {call['model']}", call, context, attributes)
+        for call in data["tool_calls"]:
+            self._child(f"tool {call['name']}", call, context, {
+                "tool.name": call["name"],
+                "tool.result_tokens": call["result_tokens"],
+                "tool.cache_hits": call["cache_hits"],
+                "tool.cache_misses": call["cache_misses"],
+            })
+        if data["error"]:
+            root.set_attribute("error", data["error"])
+        root.end(end_time=turn.end_ns)
+
+    def _child(self, name, call, context, attributes):
+        span = self.tracer.start_span(name, context=context, start_time=call["start_ns"], attributes=attributes)
+        if call["error"]:
+            span.set_attribute("error", call["error"])
+        span.end(end_time=call["start_ns"] + int(call["duration_ms"] * 1e6))
+
+
+def _make_exporter(kind):
+    if kind == "jsonl":
+        return JsonLinesExporter()
+    if kind == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            print("opentelemetry-sdk is not installed; agent traces are only printed.")
+            return None
+        provider = TracerProvider(resource=Resource.create({"service.name": AGENT_TRACE_SERVICE}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        return OpenTelemetryExporter(provider.get_tracer("weather-agent"))
+    if kind:
+        print(f"Unknown AGENT_TRACE_EXPORT '{kind}'; agent traces are only printed.")
+    return None
+
+
+exporter = _make_exporter(AGENT_TRACE_EXPORT)
+
+
+@contextlib.contextmanager
+def trace_turn(thread_id, query, source="agent"):
+    """Trace one agent turn; pass `turn.callback` in the run config's callbacks."""
+    turn = TurnTrace(thread_id, query, source)
+    token = current_turn.set(turn)
+    try:
+        yield turn
+    except Exception as e:
+        turn.error = repr(e)
+        raise
+    finally:
+        current_turn.reset(token)
+        turn.end_ns = time.time_ns()
+        print(turn.summary())
+        if exporter is not None:
+            try:
+                exporter.export(turn)
+            except Exception as e:
+                print(f"Exporting the agent trace failed: {e}")
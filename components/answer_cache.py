@@ -0,0 +1,202 @@
+"""Cache of agent answers per location, forecast run and conversation state.
+
+Users ask the same questions about the same city many times per forecast
+cycle. An answer is cached under (dashboard location, forecast-data version,
+previous exchange, normalized question), so an identical question against
+the same data skips the LLM. The previous exchange (last question and
+answer of the thread, or none for a new conversation) keeps follow-ups such
+as "yes please fetch it" from being answered with another conversation's
+reply. Versions change with every new forecast payload, and entries also
+expire after ANSWER_CACHE_TTL seconds.
+
+With ANSWER_CACHE_SIMILARITY set (e.g. 0.85), a question that is worded
+differently but close enough to a cached one (cosine similarity of hashed
+word and bigram counts, or of a local embedding model's vectors with
+ANSWER_CACHE_EMBED_MODEL) also reuses its answer. Time references and
+numbers must match exactly, so "today" is never answered with "tomorrow",
+and so must capitalized names ("Paris" vs "Rome").
+Short questions are not cached: they are usually follow-ups whose meaning
+depends on the conversation.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from components.cache import FORECAST_REFRESH_SECONDS
+from components.forecast_store import payload_version
+from components.geocoding import normalize_location
+
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", 1000))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", FORECAST_REFRESH_SECONDS))
+# Minimum cosine similarity for a reworded question to reuse an answer; 0 means exact matches only
+ANSWER_CACHE_SIMILARITY = float(os.environ.get("ANSWER_CACHE_SIMILARITY", 0))
+# Ollama embedding model (e.g. nomic-embed-text) used instead of the hashing vectorizer
+ANSWER_CACHE_EMBED_MODEL = os.environ.get("ANSWER_CACHE_EMBED_MODEL", "")
+# Questions with fewer words are treated as conversation follow-ups and not cached
+ANSWER_CACHE_MIN_WORDS = int(os.environ.get("ANSWER_CACHE_MIN_WORDS", 4))
+
+HASHING_DIMENSIONS = 2 ** 18
+
+_WORD = re.compile(r"[a-z0-9]+")
+_NAME = re.compile(r"\b[A-Z][A-Za-z]+")
+_TIME_WORDS = frozenset({
+    "now", "today", "tonight", "tomorrow", "yesterday", "morning", "afternoon", "evening", "night",
+    "weekend", "week", "weekly", "hour", "hours", "hourly", "day", "days", "daily",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+})
+
+
+def normalize_query(query):
+    """Lowercase words of a question, without punctuation or extra whitespace."""
+    return " ".join(_WORD.findall(query.lower()))
+
+
+def _key_terms(query, normalized):
+    """Words that change a question's meaning without changing its wording much."""
+    names = {name.lower() for name in _NAME.findall(query)}
+    return frozenset(word for word in normalized.split() if word in _TIME_WORDS or word.isdigit() or word in names)
+
+
+def hashing_vector(normalized):
+    """L2-normalized sparse vector of hashed word and bigram counts."""
+    words = normalized.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode("utf-8")) % HASHING_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {index: weight / norm for index, weight in vector.items()}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+def _make_embedder(model):
+    """Sparse-vector function for the similarity lookup."""
+    if not model:
+        return hashing_vector
+    try:
+        from langchain_ollama import OllamaEmbeddings
+    except ImportError:
+        print("langchain-ollama is not installed; using the hashing vectorizer for the answer cache.")
+        return hashing_vector
+    embeddings = OllamaEmbeddings(model=model)
+
+    def embed(normalized):
+        values = embeddings.embed_query(normalized)
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return {index: value / norm for index, value in enumerate(values)}
+
+    return embed
+
+
+def previous_exchange(messages):
+    """Digest of a thread's last question and answer; empty for a new conversation."""
+    last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+    if last_human is None:
+        return ""
+    answer = next((message.content for message in reversed(messages[last_human:])
+                   if isinstance(message, AIMessage) and message.content), "")
+    exchange = f"{messages[last_human].content}\n{answer}"
+    return hashlib.sha1(exchange.encode("utf-8")).hexdigest()
+
+
+def data_scope(weather_data, history=()):
+    """(location key, forecast-data version, previous exchange) of a chat turn, or None without data.
+
+    `history` is the thread's messages before the new question.
+    """
+    if not weather_data or not weather_data.get("location"):
+        return None
+    store = weather_data.get("forecast_store")
+    if store is not None:
+        version = store.version
+    elif weather_data.get("current"):
+        version = payload_version([weather_data["current"], weather_data.get("forecast")])
+    else:
+        return None
+    return normalize_location(weather_data["location"]), version, previous_exchange(history)
+
+
+class AnswerCache:
+    """Thread-safe LRU of agent answers with a TTL and optional similarity matching."""
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, similarity=ANSWER_CACHE_SIMILARITY,
+                 embed=None, min_words=ANSWER_CACHE_MIN_WORDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.min_words = min_words
+        self._embed = embed or (_make_embedder(ANSWER_CACHE_EMBED_MODEL) if similarity > 0 else None)
+        self._entries = OrderedDict()  # (scope, normalized query) -> (answer, vector, key terms, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def _cacheable(self, normalized):
+        return len(normalized.split()) >= self.min_words
+
+    def get(self, query, scope):
+        """Cached answer to `query` for a data scope (see data_scope), or None."""
+        normalized = normalize_query(query)
+        if scope is None or not self._cacheable(normalized):
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None and entry[3] > now:
+                self._entries.move_to_end((scope, normalized))
+                self.hits += 1
+                return entry[0]
+        if self._embed is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        vector = self._embed(normalized)
+        terms = _key_terms(query, normalized)
+        with self._lock:
+            best, best_score = None, self.similarity
+            for (entry_scope, entry_query), (answer, entry_vector, entry_terms, expires_at) in self._entries.items():
+                if entry_scope != scope or expires_at <= now or entry_terms != terms:
+                    continue
+                score = _cosine(vector, entry_vector)
+                if score >= best_score:
+                    best, best_score = (entry_scope, entry_query), score
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.similar_hits += 1
+            return self._entries[best][0]
+
+    def put(self, query, scope, answer):
+        """Cache the agent's answer to `query` for a data scope."""
+        normalized = normalize_query(query)
+        if scope is None or not answer or not self._cacheable(normalized):
+            return
+        vector = self._embed(normalized) if self._embed is not None else None
+        with self._lock:
+            self._entries[(scope, normalized)] = (answer, vector, _key_terms(query, normalized), time.time() + self.ttl)
+            self._entries.move_to_end((scope, normalized))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+answer_cache = AnswerCache()
@@ -0,0 +1,197 @@
+"""Asyncio HTTP layer and the sync facade in front of it.
+
+Every upstream call (Open-Meteo, Nominatim) runs as a coroutine on an
+`httpx.AsyncClient` with pooled keep-alive connections, separate
+connect/read timeouts and bounded retries on connection errors, 429 and
+5xx (jittered exponential backoff, Retry-After honoured). Each event loop
+gets its own client. Sync callers (Streamlit script threads, the prefetch
+thread, sync agent tools) go through `run_sync()`. It submits the coroutine
+to one background event loop shared by the whole process, so concurrent
+sessions' requests are multiplexed on that loop instead of each blocking a
+thread per request.
+
+Failures are raised as requests.exceptions.RequestException subclasses, so
+callers handle upstream errors with the familiar exception types.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import email.utils
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+
+from components.metrics import endpoint_label, upstream_call, upstream_retries
+
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 20))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 3))
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 20))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Upper bound on one run_sync() call, including retries
+ASYNC_IO_TIMEOUT = float(os.environ.get("ASYNC_IO_TIMEOUT", 60))
+BACKOFF_FACTOR = 0.5
+BACKOFF_JITTER = 0.5
+BACKOFF_MAX = 10
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncClient
+
+
+def get_client():
+    """The AsyncClient of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+        _clients[loop] = client
+    return client
+
+
+def _backoff(attempt):
+    return BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, BACKOFF_JITTER)
+
+
+def _retry_after(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def get(url, params=None, headers=None):
+    """GET with bounded retries on connection errors, 429 and 5xx (jittered exponential backoff)."""
+    client = get_client()
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        last = attempt == HTTP_MAX_RETRIES
+        try:
+            response = await client.get(url, params=params, headers=headers)
+        except httpx.TimeoutException as e:
+            if last:
+                raise requests.exceptions.Timeout(f"Timed out requesting {url}: {e}") from e
+            delay = _backoff(attempt)
+        except httpx.TransportError as e:
+            if last:
+                raise requests.exceptions.ConnectionError(f"Connection to {url} failed: {e}") from e
+            delay = _backoff(attempt)
+        else:
+            if last or response.status_code not in RETRY_STATUSES:
+                return response
+            delay = _retry_after(response) or _backoff(attempt)
+        upstream_retries.inc(endpoint=endpoint_label(url))
+        await asyncio.sleep(min(delay, BACKOFF_MAX))
+
+
+async def get_json(url, params=None, headers=None):
+    """GET a JSON document. Raises requests.exceptions.RequestException on failure."""
+    with upstream_call(url) as call:
+        response = await get(url, params=params, headers=headers)
+        call.size = len(response.content)
+        if response.is_error:
+            raise requests.exceptions.HTTPError(f"{response.status_code} Error: {response.reason_phrase} for url: {response.url}")
+        try:
+            return response.json()
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f"Invalid JSON from {response.url}: {e}") from e
+
+
+async def gather_timed(coroutines):
+    """Await named coroutines concurrently and time each one.
+
+    Returns (results, timings); a coroutine that raised has its exception as
+    its result, so one failing endpoint does not discard the others.
+    """
+    async def timed(coroutine):
+        start = time.perf_counter()
+        try:
+            result = await coroutine
+        except Exception as e:
+            result = e
+        return result, time.perf_counter() - start
+
+    names = list(coroutines)
+    outcomes = await asyncio.gather(*(timed(coroutines[name]) for name in names))
+    results = {name: result for name, (result, _) in zip(names, outcomes)}
+    timings = {name: elapsed for name, (_, elapsed) in zip(names, outcomes)}
+    print("Endpoint timings: " + ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in timings.items()))
+    return results, timings
+
+
+_io_loop = None
+_io_loop_lock = threading.Lock()
+
+
+def io_loop():
+    """The process-wide background event loop, started on first use."""
+    global _io_loop
+    with _io_loop_lock:
+        if _io_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="weather-io", daemon=True).start()
+            _io_loop = loop
+    return _io_loop
+
+
+def run_sync(coroutine, timeout=ASYNC_IO_TIMEOUT):
+    """Run a coroutine on the shared I/O loop and block until it finishes.
+
+    This is the sync facade over the async layer. The coroutine runs in a
+    copy of the caller's context, so context variables (e.g. the agent turn
+    being traced) carry over. After `timeout` seconds the coroutine is
+    cancelled and requests.exceptions.Timeout is raised. Do not call it from
+    a coroutine running on the I/O loop itself; await the coroutine instead.
+    """
+    loop = io_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync() cannot be called from the I/O loop; await the coroutine instead")
+
+    future = concurrent.futures.Future()
+    context = contextvars.copy_context()
+    task = None
+
+    def copy_outcome(done):
+        if done.cancelled():
+            future.set_exception(concurrent.futures.CancelledError())
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+
+    def start():
+        nonlocal task
+        if not future.set_running_or_notify_cancel():
+            coroutine.close()  # timed out before it was scheduled
+            return
+        task = loop.create_task(coroutine, context=context)
+        task.add_done_callback(copy_outcome)
+
+    loop.call_soon_threadsafe(start)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError as e:
+        # Stop the abandoned coroutine instead of letting it run on in the background
+        if not future.cancel():
+            loop.call_soon_threadsafe(lambda: task.cancel())
+        raise requests.exceptions.Timeout(f"Async I/O did not finish within {timeout:g}s") from e
@@ -0,0 +1,387 @@
+"""Process-wide caches shared by every session.
+
+The dashboard and the agent tools ask for overlapping variables at the same
+points. Responses are keyed on (endpoint, rounded coordinates, other params)
+and remember which current/hourly/daily variables they hold, so a request
+for a subset of an already-cached variable set is answered locally.
+
+Entries expire at the next forecast-refresh boundary rather than a sliding
+TTL: everything fetched within one refresh window belongs to the same model
+run and rolls over together.
+
+SingleFlight coalesces concurrent identical fetches: when ten sessions ask
+for the same city at once, one request goes upstream and the others wait
+for its result. ResultCache combines it with a memory-bounded LRU for
+whole results (e.g. dashboard snapshots) that are costly to rebuild.
+
+With a shared backend configured (components/cache_backend.py), responses
+are also written to it and read from it on a local miss, so replicas share
+their upstream fetches.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from components.cache_backend import shared_backend
+
+FORECAST_REFRESH_SECONDS = float(os.environ.get("FORECAST_REFRESH_SECONDS", 900))
+COORDINATE_PRECISION = int(os.environ.get("COORDINATE_PRECISION", 2))  # ~1 km at 2 decimals
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 512))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 512))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+VARIABLE_SECTIONS = ("current", "hourly", "daily")
+
+# List collecting (cache name, hit) lookups while set, e.g. for one traced tool call
+cache_events = contextvars.ContextVar("cache_events", default=None)
+
+
+def note_cache_event(name, hit):
+    """Record a cache lookup in the current cache_events list, if any."""
+    events = cache_events.get()
+    if events is not None:
+        events.append((name, hit))
+
+
+def _split_params(params):
+    """Split request params into the variable sets and everything else."""
+    variables = {}
+    rest = []
+    for name, value in params.items():
+        if name in VARIABLE_SECTIONS:
+            variables[name] = frozenset(value.split(","))
+        elif name not in ("latitude", "longitude"):
+            rest.append((name, str(value)))
+    return variables, tuple(sorted(rest))
+
+
+def response_key(url, params, precision=COORDINATE_PRECISION):
+    """Cache key shared by every variable set requested at one point."""
+    _, rest = _split_params(params)
+    return (
+        url,
+        round(float(params["latitude"]), precision),
+        round(float(params["longitude"]), precision),
+        rest,
+    )
+
+
+def request_key(url, params):
+    """Key identifying one upstream request exactly (for request coalescing)."""
+    return url, tuple(sorted((name, str(value)) for name, value in (params or {}).items()))
+
+
+def approximate_size(value, _seen=None):
+    """Rough deep size in bytes of a cached result (containers, DataFrames and plain objects)."""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if hasattr(value, "memory_usage") and hasattr(value, "columns"):  # DataFrame
+        return int(value.memory_usage(index=True, deep=True).sum())
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approximate_size(k, seen) + approximate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, seen) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += approximate_size(vars(value), seen)
+    return size
+
+
+def _shared_key(url, params):
+    """Backend key of one exact request (point, params and variable sets)."""
+    variables, _ = _split_params(params)
+    identity = (response_key(url, params), sorted((section, sorted(names)) for section, names in variables.items()))
+    return "om:" + hashlib.blake2b(repr(identity).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _select(data, variables):
+    """Copy of a response holding only the requested variables."""
+    selected = {k: v for k, v in data.items() if k not in VARIABLE_SECTIONS and not k.endswith("_units")}
+    for section, names in variables.items():
+        keep = names | {"time", "interval"}
+        if section in data:
+            selected[section] = {k: v for k, v in data[section].items() if k in keep}
+        if f"{section}_units" in data:
+            selected[f"{section}_units"] = {k: v for k, v in data[f"{section}_units"].items() if k in keep}
+    return selected
+
+
+class ResponseCache:
+    """Thread-safe cache of JSON responses with superset matching on variables."""
+
+    def __init__(self, refresh_seconds=FORECAST_REFRESH_SECONDS, max_entries=RESPONSE_CACHE_SIZE, backend=None):
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> list of (variables, data, expires_at), least recently used first
+        self._count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+
+    def _next_refresh(self, now):
+        return (now // self.refresh_seconds + 1) * self.refresh_seconds
+
+    def lookup(self, url, params):
+        """Return a cached response covering the requested variables, or None.
+
+        Checks this process first, then the shared backend if there is one.
+        """
+        data = self.lookup_local(url, params)
+        if data is None and self.backend is not None:
+            data = self.lookup_shared(url, params)
+        note_cache_event("response", data is not None)
+        return data
+
+    def lookup_shared(self, url, params):
+        """Shared-backend lookup of this exact request; a hit is also kept locally."""
+        data = self.backend.get(_shared_key(url, params))
+        if data is None:
+            return None
+        with self._lock:
+            self.shared_hits += 1
+        self.store_local(url, params, data)
+        return data
+
+    def lookup_local(self, url, params):
+        """In-process lookup with superset matching on the variables."""
+        variables, _ = _split_params(params)
+        key = response_key(url, params)
+        now = time.time()
+        with self._lock:
+            entries = self._entries.get(key, [])
+            live = [entry for entry in entries if entry[2] > now]
+            if len(live) != len(entries):
+                self._count -= len(entries) - len(live)
+                if live:
+                    self._entries[key] = live
+                else:
+                    self._entries.pop(key, None)
+
+            for cached_variables, data, _ in live:
+                if all(names <= cached_variables.get(section, frozenset())
+                       for section, names in variables.items()):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _select(data, variables)
+            self.misses += 1
+            return None
+
+    def store(self, url, params, data):
+        """Cache a response until the next forecast-refresh boundary, here and in the shared backend."""
+        expires_at = self.store_local(url, params, data)
+        if self.backend is not None:
+            self.backend.set(_shared_key(url, params), data, expires_at - time.time())
+
+    def store_local(self, url, params, data):
+        """Cache a response in this process; returns its expiry time."""
+        variables, _ = _split_params(params)
+        key = response_key(url, params)
+        expires_at = self._next_refresh(time.time())
+        with self._lock:
+            entries = self._entries.setdefault(key, [])
+            # A new entry supersedes any cached variable set it fully covers
+            kept = [entry for entry in entries
+                    if not all(names <= variables.get(section, frozenset())
+                               for section, names in entry[0].items())]
+            self._count -= len(entries) - len(kept)
+            kept.append((variables, data, expires_at))
+            self._entries[key] = kept
+            self._entries.move_to_end(key)
+            self._count += 1
+
+            while self._count > self.max_entries and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._count -= len(evicted)
+        return expires_at
+
+    def stats(self):
+        """Counters and current size, e.g. for logging or a debug view."""
+        with self._lock:
+            return {
+                "entries": self._count,
+                "hits": self.hits,
+                "misses": self.misses,
+                "shared_hits": self.shared_hits
+            }
+
+    def clear(self):
+        """Drop the entries of this process (the shared backend is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self._count = 0
+
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    The first caller for a key runs the fetch; callers arriving while it is
+    in flight wait for its result (or exception) instead of repeating it.
+    Works for threads and coroutines alike, including across event loops.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> concurrent.futures.Future
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key):
+        """(future, leader): the in-flight future for `key`, and whether this caller must run it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = concurrent.futures.Future()
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run(self, key, fetch):
+        """Result of `fetch()`, shared with concurrent callers for the same key."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fetch()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def arun(self, key, fetch):
+        """Async run(): `fetch` is a coroutine function."""
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded so a cancelled waiter does not cancel the shared call
+            return await asyncio.shield(asyncio.wrap_future(future))
+        try:
+            result = await fetch()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+
+class ResultCache:
+    """Thread-safe LRU of computed results, bounded by entry count and approximate bytes.
+
+    Entries expire at the next forecast-refresh boundary. Misses are
+    coalesced, so concurrent requests for the same key compute it once.
+    """
+
+    def __init__(self, refresh_seconds=FORECAST_REFRESH_SECONDS, max_entries=RESULT_CACHE_SIZE,
+                 max_bytes=RESULT_CACHE_MAX_BYTES, sizeof=approximate_size):
+        self.refresh_seconds = refresh_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _next_refresh(self, now):
+        return (now // self.refresh_seconds + 1) * self.refresh_seconds
+
+    def get(self, key):
+        """Cached value for `key`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.time():
+                self._bytes -= entry[1]
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Cache a value until the next forecast-refresh boundary, evicting least recently used entries."""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        expires_at = self._next_refresh(time.time())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_fetch(self, key, fetch, cacheable=lambda value: value is not None):
+        """Cached value for `key`, calling `fetch()` once across concurrent callers on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        def fetch_and_store():
+            result = fetch()
+            if cacheable(result):
+                self.put(key, result)
+            return result
+
+        return self._flight.run(key, fetch_and_store)
+
+    async def aget_or_fetch(self, key, fetch, cacheable=lambda value: value is not None):
+        """Async get_or_fetch(): `fetch` is a coroutine function."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        async def fetch_and_store():
+            result = await fetch()
+            if cacheable(result):
+                self.put(key, result)
+            return result
+
+        return await self._flight.arun(key, fetch_and_store)
+
+    def stats(self):
+        """Counters and current size, e.g. for logging or a debug view."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self._flight.coalesced,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+response_cache = ResponseCache(backend=shared_backend)
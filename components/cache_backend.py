@@ -0,0 +1,269 @@
+"""Shared cache tier for deployments with several app replicas.
+
+The in-process caches (responses, geocodes) are per replica, so behind a
+load balancer every replica pays for its own upstream calls. When
+CACHE_BACKEND_URL is set, those caches also read and write a shared
+backend, and one replica's fetch is a hit for all the others:
+
+    CACHE_BACKEND_URL=redis://cache:6379/0   any Redis-protocol server
+    CACHE_BACKEND_URL=memory://              in-process (single replica, tests)
+
+Values are serialized compactly: msgpack when installed (JSON otherwise),
+zstd-compressed when zstandard is installed. A one-byte header records the
+format of each value, so replicas with different optional packages can
+still read each other's entries. Backend errors never fail a request: the
+backend is treated as a miss and skipped for CACHE_BACKEND_RETRY seconds.
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Empty disables the shared tier
+CACHE_BACKEND_URL = os.environ.get("CACHE_BACKEND_URL", "")
+CACHE_BACKEND_PREFIX = os.environ.get("CACHE_BACKEND_PREFIX", "weather:")
+CACHE_BACKEND_TIMEOUT = float(os.environ.get("CACHE_BACKEND_TIMEOUT", 0.25))  # seconds per command
+# Seconds to skip the backend after it failed
+CACHE_BACKEND_RETRY = float(os.environ.get("CACHE_BACKEND_RETRY", 30))
+MEMORY_BACKEND_SIZE = int(os.environ.get("MEMORY_BACKEND_SIZE", 4096))
+
+COMPRESS_MIN_BYTES = 256
+ZSTD_LEVEL = 3
+
+# Header byte: payload format and whether it is zstd-compressed
+_MSGPACK, _JSON, _MSGPACK_ZSTD, _JSON_ZSTD = b"m", b"j", b"M", b"J"
+
+
+def encode_value(value):
+    """Serialize a JSON-compatible value into the compact backend format."""
+    if msgpack is not None:
+        fmt, data = _MSGPACK, msgpack.packb(value, use_bin_type=True)
+    else:
+        fmt, data = _JSON, json.dumps(value, separators=(",", ":")).encode("utf-8")
+    if zstandard is not None and len(data) >= COMPRESS_MIN_BYTES:
+        fmt, data = fmt.upper(), zstandard.compress(data, ZSTD_LEVEL)
+    return fmt + data
+
+
+def decode_value(blob):
+    """Inverse of encode_value. Raises ValueError for a format this process cannot read."""
+    fmt, data = blob[:1], blob[1:]
+    if fmt in (_MSGPACK_ZSTD, _JSON_ZSTD):
+        if zstandard is None:
+            raise ValueError("zstd-compressed cache entry but zstandard is not installed")
+        fmt, data = fmt.lower(), zstandard.decompress(data)
+    if fmt == _MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack cache entry but msgpack is not installed")
+        return msgpack.unpackb(data, raw=False)
+    if fmt == _JSON:
+        return json.loads(data)
+    raise ValueError(f"Unknown cache entry format {fmt!r}")
+
+
+class CacheBackend:
+    """Key/value store of encoded values with a per-entry TTL.
+
+    Subclasses implement get_bytes/set_bytes; get/set handle serialization
+    and swallow backend and decoding errors so callers only see misses.
+    """
+
+    def get_bytes(self, key):
+        raise NotImplementedError
+
+    def set_bytes(self, key, data, ttl):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Cached value for `key`, or None on a miss or a backend error."""
+        data = self.get_bytes(CACHE_BACKEND_PREFIX + key)
+        if data is None:
+            return None
+        try:
+            return decode_value(data)
+        except Exception as e:
+            print(f"Cache entry {key} could not be decoded: {e}")
+            return None
+
+    def set(self, key, value, ttl):
+        """Store `value` for `ttl` seconds (ignored when the ttl has already run out)."""
+        if ttl <= 0:
+            return
+        self.set_bytes(CACHE_BACKEND_PREFIX + key, encode_value(value), ttl)
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend: a thread-safe LRU of encoded values."""
+
+    def __init__(self, max_entries=MEMORY_BACKEND_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (data, expires_at)
+        self._lock = threading.Lock()
+
+    def get_bytes(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set_bytes(self, key, data, ttl):
+        with self._lock:
+            self._entries[key] = (data, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisBackend(CacheBackend):
+    """Minimal Redis-protocol (RESP2) client: GET and SET with PX.
+
+    Keeps one connection per thread. Works with Redis, Valkey, KeyDB and
+    other servers speaking the Redis protocol.
+    """
+
+    def __init__(self, url, timeout=CACHE_BACKEND_TIMEOUT, retry_after=CACHE_BACKEND_RETRY):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._local = threading.local()
+        self._down_until = 0.0
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        connection = (sock, sock.makefile("rb"))
+        if self.password:
+            auth = (self.username, self.password) if self.username else (self.password,)
+            self._send(connection, "AUTH", *auth)
+        if self.db:
+            self._send(connection, "SELECT", self.db)
+        return connection
+
+    @staticmethod
+    def _pack(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    @classmethod
+    def _read(cls, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by the cache server")
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b"+":
+            return body
+        if prefix == b"-":
+            raise RedisError(body.decode("utf-8", "replace"))
+        if prefix == b":":
+            return int(body)
+        if prefix == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by the cache server")
+            return data[:-2]
+        if prefix == b"*":
+            length = int(body)
+            return None if length < 0 else [cls._read(reader) for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line[:32]!r}")
+
+    def _send(self, connection, *args):
+        sock, reader = connection
+        sock.sendall(self._pack(args))
+        return self._read(reader)
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            try:
+                connection[1].close()
+                connection[0].close()
+            except OSError:
+                pass
+
+    def command(self, *args):
+        """Run one command; returns None (a miss) while the backend is unavailable."""
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            return self._send(connection, *args)
+        except (OSError, RedisError) as e:
+            self._close()
+            self._down_until = time.monotonic() + self.retry_after
+            print(f"Cache backend {self.host}:{self.port} unavailable for {self.retry_after:.0f}s: {e}")
+            return None
+
+    def get_bytes(self, key):
+        return self.command("GET", key)
+
+    def set_bytes(self, key, data, ttl):
+        self.command("SET", key, data, "PX", max(1, int(ttl * 1000)))
+
+
+def create_backend(url):
+    """Backend for a CACHE_BACKEND_URL, or None when the shared tier is disabled."""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme in ("redis", "valkey"):
+        return RedisBackend(url)
+    print(f"Unsupported CACHE_BACKEND_URL scheme '{scheme}'; the shared cache tier is disabled.")
+    return None
+
+
+shared_backend = create_backend(CACHE_BACKEND_URL)
+
+
+async def cache_io(call, *args, blocking=False):
+    """Await a cache call from a coroutine.
+
+    Calls that may reach the shared backend, or that do blocking I/O of their
+    own (blocking=True, e.g. SQLite), run in a worker thread so they do not
+    block the event loop.
+    """
+    if shared_backend is None and not blocking:
+        return call(*args)
+    return await asyncio.to_thread(call, *args)
@@ -0,0 +1,117 @@
+"""HTML card templates for the weather tabs.
+
+The card markup is kept here as module-level format strings, so rendering a
+card is a single fill of a prebuilt template rather than a large f-string
+assembled inside the display code. Bound `str.format` methods are used
+directly as the render functions.
+"""
+from components.weather_codes import get_weather_description
+
+_MAIN_WEATHER_CARD = """
+<div class="main-weather-card">
+    <div class="weather-primary">
+        <span class="temperature-large">{temperature}{unit}</span>
+        <div class="weather-icon-large">{icon}</div>
+    </div>
+    <div class="weather-description">
+        <div class="weather-condition">{description}</div>
+        <div class="feels-like">Feels like: {feels_like}{unit}</div>
+    </div>
+</div>
+"""
+
+_SUN_TIMES_CARD = """
+<div class="highlight-metrics-container">
+    <div class="highlight-metric-card">
+        <div class="metric-icon">🌅</div>
+        <div class="metric-details">
+            <div class="metric-value">{sunrise}</div>
+            <div class="metric-name">Sunrise</div>
+        </div>
+    </div>
+    <div class="highlight-metric-card">
+        <div class="metric-icon">🌇</div>
+        <div class="metric-details">
+            <div class="metric-value">{sunset}</div>
+            <div class="metric-name">Sunset</div>
+        </div>
+    </div>
+</div>
+"""
+
+_METRIC_CARD = """
+<div class="metric-card">
+    <div class="metric-card-icon">{icon}</div>
+    <div class="metric-card-label">{label}</div>
+    <div class="metric-card-value">{value}</div>
+</div>
+"""
+
+_HOURLY_CARD = """
+<div class='hourly-forecast-card'>
+    <div style='font-weight: bold; font-size: 16px; color: #E0E0E0;'>{hour}</div>
+    <div style='font-size: 24px; margin: 10px 0;'>{icon}</div>
+    <div class='forecast-value' style='color: #ff8c42;'>{temperature:.1f}{temperature_unit}</div>
+    <div class='forecast-label' style='color: #E0E0E0;'>💧 {precipitation_probability}%</div>
+    <div class='forecast-label' style='color: #E0E0E0;'>💨 {windspeed:.1f} {windspeed_unit}</div>
+    <div class='forecast-label' style='color: #E0E0E0;'>☁️ {cloudcover}%</div>
+</div>
+"""
+
+_DAILY_CARD = """
+<div class='daily-forecast-card'>
+    <div style='font-weight: bold; font-size: 16px; color: #E0E0E0;'>{weekday}</div>
+    <div class='forecast-label' style='color: #D3D3D3;'>{day}</div>
+    <div style='font-size: 28px; margin: 10px 0;'>{icon}</div>
+    <div class='forecast-value' style='color: #ff8c42;'>{max_temp:.1f}{max_unit}</div>
+    <div class='forecast-label' style='color: #E0E0E0;'>{min_temp:.1f}{min_unit}</div>
+    <div class='forecast-label' style='margin-top: 8px; color: #E0E0E0;'>💧 {precipitation:.1f} {precipitation_unit}</div>
+</div>
+"""
+
+_POLLUTANT_CARD = """
+<div style='background-color: #2d4b73; border-radius: 10px; padding: 12px; text-align: center; height: 100px; display: flex; flex-direction: column; justify-content: center; border: 1px solid rgba(255, 140, 66, 0.1); transition: transform 0.2s;'>
+    <div style='display: flex; align-items: center; justify-content: center; gap: 6px; margin-bottom: 5px;'>
+        <span style='font-size: 18px;'>{icon}</span>
+        <span style='font-size: 14px; color: #E0E0E0;'>{pollutant}</span>
+    </div>
+    <div style='font-size: 18px; font-weight: 600; color: #ff8c42;'>{value} {unit}</div>
+</div>
+"""
+
+main_weather_card = _MAIN_WEATHER_CARD.format
+sun_times_card = _SUN_TIMES_CARD.format
+metric_card = _METRIC_CARD.format
+hourly_card = _HOURLY_CARD.format
+daily_card = _DAILY_CARD.format
+pollutant_card = _POLLUTANT_CARD.format
+
+
+def hourly_cards(hourly_df, hourly_units, count):
+    """Cards for the first `count` rows of the dashboard hourly frame."""
+    temperature_unit = hourly_units.get('temperature_2m', '°C')
+    windspeed_unit = hourly_units.get('windspeed_10m', 'km/h')
+    return [
+        hourly_card(
+            hour=row.hour, icon=get_weather_description(row.weathercode)['icon'],
+            temperature=row.temperature, temperature_unit=temperature_unit,
+            precipitation_probability=row.precipitation_probability,
+            windspeed=row.windspeed, windspeed_unit=windspeed_unit, cloudcover=row.cloudcover
+        )
+        for row in hourly_df.head(count).itertuples(index=False)
+    ]
+
+
+def daily_cards(daily_df, daily_units, count):
+    """Cards for the first `count` rows of the dashboard daily frame."""
+    max_unit = daily_units.get('temperature_2m_max', '°C')
+    min_unit = daily_units.get('temperature_2m_min', '°C')
+    precipitation_unit = daily_units.get('precipitation_sum', 'mm')
+    return [
+        daily_card(
+            weekday=row.weekday, day=row.day, icon=get_weather_description(row.weathercode)['icon'],
+            max_temp=row.max_temp, max_unit=max_unit, min_temp=row.min_temp, min_unit=min_unit,
+            precipitation=row.precipitation, precipitation_unit=precipitation_unit
+        )
+        for row in daily_df.head(count).itertuples(index=False)
+    ]
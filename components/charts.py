@@ -0,0 +1,146 @@
+"""Plotly figure builders for the forecast tabs.
+
+Kept free of Streamlit calls so the display functions in app.py and the
+benchmark suite share exactly the same construction code. The DataFrames
+they plot come from the ForecastStore (components/forecast_store.py).
+"""
+import plotly.graph_objects as go
+
+AQI_CATEGORIES = {
+    (0, 10): {"category": "Very Good", "color": "#50F0E6", "description": "Air quality is excellent. Ideal for outdoor activities."},
+    (10, 50): {"category": "Good", "color": "#50CCAA", "description": "Air quality is good. Suitable for outdoor activities."},
+    (50, 100): {"category": "Moderate", "color": "#F0E641", "description": "Air quality is acceptable. Sensitive individuals should limit prolonged outdoor exertion."},
+    (100, 200): {"category": "Poor", "color": "#FF5050", "description": "Air quality is unhealthy for sensitive groups. Limit outdoor exertion."},
+    (200, 400): {"category": "Very Poor", "color": "#960032", "description": "Air quality is unhealthy. Everyone should limit outdoor exertion."},
+    (400, 700): {"category": "Hazardous", "color": "#5E1742", "description": "Health alert: serious effects for all. Avoid outdoor activities."},
+    (700, 1000): {"category": "Severe", "color": "#3C0F2D", "description": "Extreme danger: air quality is life-threatening. Stay indoors."}
+}
+
+UNKNOWN_AQI = {"category": "Unknown", "color": "#CCCCCC", "description": "Unable to determine air quality category."}
+
+
+def hourly_temperature_figure(hourly_df, hourly_units):
+    """Line chart of the hourly temperature forecast."""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=hourly_df['time'], y=hourly_df['temperature'],
+        mode='lines+markers', name='Temperature',
+        line=dict(color='#E67E22', width=3), marker=dict(size=8)
+    ))
+    fig.update_layout(
+        title='Hourly Temperature Forecast', xaxis_title='', yaxis_title=f'Temperature ({hourly_units.get("temperature_2m", "°C")})',
+        height=300, margin=dict(l=0, r=0, t=40, b=0), plot_bgcolor='rgba(32, 44, 68, 0.8)',
+        paper_bgcolor='rgba(32, 44, 68, 0)', font=dict(color='#FFFFFF'),
+        xaxis=dict(showgrid=False, tickformat='%H:%M', tickangle=-45, tickmode='array',
+                   tickvals=hourly_df['time'][::2], ticktext=hourly_df['hour'][::2]),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255, 255, 255, 0.1)')
+    )
+    return fig
+
+
+def daily_temperature_figure(daily_df, daily_units):
+    """Min/max temperature trend chart for the daily forecast."""
+    fig = go.Figure()
+
+    # Add max temperature line
+    fig.add_trace(go.Scatter(
+        x=daily_df['date'],
+        y=daily_df['max_temp'],
+        mode='lines+markers',
+        name='Max Temp',
+        line=dict(color='#E67E22', width=3),
+        marker=dict(size=8)
+    ))
+
+    # Add min temperature line
+    fig.add_trace(go.Scatter(
+        x=daily_df['date'],
+        y=daily_df['min_temp'],
+        mode='lines+markers',
+        name='Min Temp',
+        line=dict(color='#3498DB', width=3),
+        marker=dict(size=8)
+    ))
+
+    # Customize layout
+    fig.update_layout(
+        title={
+            'text': 'Temperature Trend',
+            'font': {'size': 24, 'color': '#FFFFFF'},
+            'y': 0.95
+        },
+        xaxis_title='',
+        yaxis_title=f'Temperature ({daily_units.get("temperature_2m_max", "°C")})',
+        height=300,
+        margin=dict(l=0, r=0, t=40, b=0),
+        plot_bgcolor='rgba(44, 62, 80, 0.8)',
+        paper_bgcolor='rgba(32, 44, 68, 0)',
+        font=dict(color='#FFFFFF'),
+        xaxis=dict(
+            showgrid=False,
+            tickformat='%a %d',
+            tickangle=-45, tickfont=dict(color='#FFFFFF')
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridcolor='rgba(255, 255, 255, 0.2)', tickfont=dict(color='#FFFFFF')
+        ),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            bgcolor='rgba(32, 44, 68, 0.8)',
+            font=dict(color='#FFFFFF')
+        )
+    )
+    return fig
+
+
+def aqi_category(aqi):
+    """Category, color and advice for a European AQI value."""
+    return next(
+        (info for (min_val, max_val), info in AQI_CATEGORIES.items() if min_val <= aqi < max_val),
+        UNKNOWN_AQI
+    )
+
+
+def aqi_gauge_figure(current_aqi, aqi_info):
+    """Gauge indicator for the current European AQI."""
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=current_aqi,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Air Quality Index", 'font': {'size': 22, 'color': '#E0E0E0'}},
+        gauge={
+            'axis': {'range': [0, 1000], 'tickwidth': 1, 'tickcolor': "#E0E0E0"},
+            'bar': {'color': aqi_info['color']},
+            'bgcolor': "rgba(255, 255, 255, 0.1)",
+            'borderwidth': 2,
+            'bordercolor': "#E0E0E0",
+            'steps': [
+                {'range': [0, 10], 'color': "#50F0E6"},
+                {'range': [10, 50], 'color': "#50CCAA"},
+                {'range': [50, 100], 'color': "#F0E641"},
+                {'range': [100, 200], 'color': "#FF5050"},
+                {'range': [200, 400], 'color': "#960032"},
+                {'range': [400, 700], 'color': "#5E1742"},
+                {'range': [700, 1000], 'color': "#3C0F2D"}
+            ],
+            'threshold': {
+                'line': {'color': "#E0E0E0", 'width': 4},
+                'thickness': 0.75,
+                'value': current_aqi
+            }
+        },
+        number={'font': {'color': aqi_info['color'], 'size': 38}}
+    ))
+
+    fig.update_layout(
+        height=250,
+        margin=dict(l=20, r=20, t=40, b=10),
+        paper_bgcolor='rgba(32, 44, 68, 0)',
+        font=dict(color='#E0E0E0')
+    )
+    return fig
@@ -0,0 +1,51 @@
+"""Process-wide cache of the Plotly figures shown in the forecast tabs.
+
+Building a figure costs several times more than handing it to Streamlit, and
+the same figure is drawn on every rerun of a tab, for every session looking
+at the same location. Figures are keyed on (location, data version, tab),
+where the data version identifies the forecast or air-quality payload, so a
+new fetch produces new figures and everything else reuses the cached ones.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+FIGURE_CACHE_SIZE = int(os.environ.get("FIGURE_CACHE_SIZE", 128))
+
+
+class FigureCache:
+    """Thread-safe LRU of built figures."""
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (location, version, tab) -> figure
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Cached figure for `key`, calling `build()` on a miss.
+
+        Callers must not mutate the returned figure; it is shared across sessions.
+        """
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return figure
+            self.misses += 1
+
+        figure = build()
+        with self._lock:
+            self._entries[key] = figure
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+figure_cache = FigureCache()
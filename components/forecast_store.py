@@ -0,0 +1,176 @@
+"""Columnar forecast data, parsed once per fetch.
+
+The dashboard tabs and the agent tools used to rebuild DataFrames, and
+re-parse timestamps, from the raw JSON lists on every Streamlit rerun and
+tool call. A ForecastStore parses a payload once into typed frames
+(datetime64 `time`, numeric metric columns). The dashboard views derived
+from those frames are memoized on the store, so a rerun only reads them.
+Stores are shared through a small LRU keyed on the location and the
+payload's issue time. The dashboard and the agent tools therefore reuse
+the same parsed data within a refresh window.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+
+import pandas as pd
+
+FORECAST_STORE_SIZE = int(os.environ.get("FORECAST_STORE_SIZE", 256))
+DASHBOARD_HOURS = 24
+
+# API variable -> dashboard column
+_HOURLY_COLUMNS = {
+    "temperature_2m": "temperature",
+    "precipitation_probability": "precipitation_probability",
+    "weathercode": "weathercode",
+    "cloudcover": "cloudcover",
+    "windspeed_10m": "windspeed",
+}
+_DAILY_COLUMNS = {
+    "temperature_2m_max": "max_temp",
+    "temperature_2m_min": "min_temp",
+    "precipitation_sum": "precipitation",
+    "weathercode": "weathercode",
+    "windspeed_10m_max": "wind_speed",
+}
+
+
+def payload_version(payload):
+    """Short content hash identifying one API payload (e.g. for figure caching)."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def series_frame(series):
+    """Typed DataFrame of one columnar API section ({variable: [values]})."""
+    frame = pd.DataFrame(series)
+    if "time" in frame:
+        frame["time"] = pd.to_datetime(frame["time"])
+    return frame
+
+
+def dashboard_hourly_frame(frame, hours=DASHBOARD_HOURS):
+    """Hourly tab frame: the first `hours` steps with dashboard column names."""
+    head = frame.head(hours)
+    view = pd.DataFrame({"time": head["time"]})
+    for variable, column in _HOURLY_COLUMNS.items():
+        view[column] = head[variable] if variable in head else 0
+    view["hour"] = view["time"].dt.strftime("%H:%M")
+    return view.reset_index(drop=True)
+
+
+def dashboard_daily_frame(frame):
+    """Daily tab frame with dashboard column names and weekday/day labels."""
+    view = pd.DataFrame({"date": frame["time"]})
+    for variable, column in _DAILY_COLUMNS.items():
+        view[column] = frame[variable]
+    view["weekday"] = view["date"].dt.strftime("%a")
+    view["day"] = view["date"].dt.strftime("%d")
+    return view
+
+
+class ForecastStore:
+    """Current, hourly and daily data of one forecast payload in columnar form."""
+
+    def __init__(self, bundle):
+        self.version = payload_version(bundle)
+        self.latitude = bundle.get("latitude")
+        self.longitude = bundle.get("longitude")
+        self.timezone = bundle.get("timezone")
+        self.utc_offset_seconds = bundle.get("utc_offset_seconds", 0)
+        self.current = dict(bundle.get("current", {}))
+        self.current_units = bundle.get("current_units", {})
+        self.hourly_units = bundle.get("hourly_units", {})
+        self.daily_units = bundle.get("daily_units", {})
+        self.hourly = series_frame(bundle.get("hourly", {}))
+        self.daily = series_frame(bundle.get("daily", {}))
+
+    @cached_property
+    def dashboard_hourly(self):
+        return dashboard_hourly_frame(self.hourly)
+
+    @cached_property
+    def dashboard_daily(self):
+        return dashboard_daily_frame(self.daily)
+
+    @cached_property
+    def sun_times(self):
+        """Today's (sunrise, sunset) as "06:42 AM" labels, "N/A" when missing."""
+        labels = []
+        for column in ("sunrise", "sunset"):
+            values = self.daily.get(column)
+            if values is None or values.empty or pd.isna(values.iloc[0]):
+                labels.append("N/A")
+            else:
+                labels.append(pd.to_datetime(values.iloc[0]).strftime("%I:%M %p"))
+        return tuple(labels)
+
+    def next_hours(self, hours=7):
+        """Hourly rows for the next `hours` hours, starting at the current local hour."""
+        if "time" not in self.hourly:
+            return self.hourly
+        # Naive local time, comparable with the payload's naive timestamps
+        local_now = (datetime.now(timezone.utc) + timedelta(seconds=self.utc_offset_seconds)).replace(tzinfo=None)
+        current_hour = pd.Timestamp(local_now.replace(minute=0, second=0, microsecond=0))
+        start = int(self.hourly["time"].searchsorted(current_hour))
+        if start >= len(self.hourly):
+            start = 0
+        return self.hourly.iloc[start:start + hours]
+
+    def daily_columns(self, metrics):
+        """Daily rows restricted to `metrics` (plus time)."""
+        return self.daily[[column for column in self.daily.columns if column == "time" or column in metrics]]
+
+
+class AirQualityStore:
+    """Hourly air-quality data of one payload in columnar form."""
+
+    def __init__(self, payload):
+        self.version = payload_version(payload)
+        self.units = payload.get("hourly_units", {})
+        self.hourly = series_frame(payload.get("hourly", {}))
+
+    def first(self, variable, default=None):
+        """Value of `variable` in the first hourly row."""
+        if variable not in self.hourly or self.hourly.empty:
+            return default
+        value = self.hourly[variable].iloc[0]
+        return default if pd.isna(value) else value.item()
+
+
+def _store_key(bundle):
+    hourly_times = bundle.get("hourly", {}).get("time") or [None]
+    return (
+        round(bundle.get("latitude", 0), 2),
+        round(bundle.get("longitude", 0), 2),
+        bundle.get("timezone"),
+        (bundle.get("current") or {}).get("time"),
+        hourly_times[0],
+        tuple(sorted(bundle.get("hourly", {}))),
+        tuple(sorted(bundle.get("daily", {}))),
+    )
+
+
+_stores = OrderedDict()  # payload key -> ForecastStore
+_stores_lock = threading.Lock()
+
+
+def forecast_store(bundle):
+    """Shared ForecastStore for a forecast payload, parsed on first use."""
+    key = _store_key(bundle)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None:
+            _stores.move_to_end(key)
+            return store
+
+    store = ForecastStore(bundle)
+    with _stores_lock:
+        _stores[key] = store
+        while len(_stores) > FORECAST_STORE_SIZE:
+            _stores.popitem(last=False)
+    return store
@@ -0,0 +1,186 @@
+"""Process-wide geocoding cache in front of Nominatim.
+
+Lives in its own module so the cache survives Streamlit reruns (app.py is
+re-executed on every interaction, imported modules are not). Entries are
+kept in a bounded LRU in memory, in the shared cache backend when one is
+configured (so replicas share their lookups) and, optionally, in a SQLite
+file so they also survive process restarts. `ageocode` queries Nominatim's
+search API through components.async_http, spacing its requests by
+NOMINATIM_MIN_DELAY; concurrent lookups of the same location share one
+Nominatim request.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from components import async_http
+from components.cache import SingleFlight, note_cache_event
+from components.cache_backend import cache_io, shared_backend
+from components.metrics import count_failure, timed
+
+GEOCODE_CACHE_SIZE = int(os.environ.get("GEOCODE_CACHE_SIZE", 1024))
+GEOCODE_CACHE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600))  # seconds
+# Set to an empty string to keep the cache in memory only
+GEOCODE_CACHE_PATH = os.environ.get("GEOCODE_CACHE_PATH", "geocode_cache.sqlite3")
+NOMINATIM_DOMAIN = os.environ.get("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.environ.get("NOMINATIM_SCHEME", "https")
+NOMINATIM_MIN_DELAY = float(os.environ.get("NOMINATIM_MIN_DELAY", 1))  # seconds between requests
+NOMINATIM_USER_AGENT = "weather_dashboard_app_v3.99"
+
+
+def normalize_location(location_name):
+    """Normalize a location string so 'London', ' london ' and 'LONDON' share a key."""
+    return " ".join(location_name.lower().split())
+
+
+class GeocodeCache:
+    """Thread-safe LRU cache of location -> (latitude, longitude) with a TTL."""
+
+    def __init__(self, max_size=GEOCODE_CACHE_SIZE, ttl=GEOCODE_CACHE_TTL, db_path=None, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_path = db_path
+        self.backend = backend
+        self._entries = OrderedDict()  # key -> (latitude, longitude, stored_at)
+        self._lock = threading.Lock()
+        if db_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode ("
+                    "key TEXT PRIMARY KEY, latitude REAL, longitude REAL, stored_at REAL)"
+                )
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _expired(self, stored_at):
+        return time.time() - stored_at > self.ttl
+
+    def get(self, location_name):
+        """Return cached (latitude, longitude) or None on a miss."""
+        key = normalize_location(location_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if not self._expired(entry[2]):
+                    self._entries.move_to_end(key)
+                    return entry[0], entry[1]
+                del self._entries[key]
+
+        if self.backend is not None:
+            shared = self.backend.get("geo:" + key)
+            if shared is not None:
+                self._remember(key, shared)
+                return shared[0], shared[1]
+
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT latitude, longitude, stored_at FROM geocode WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Geocode cache read failed: {e}")
+            return None
+        if row is None or self._expired(row[2]):
+            return None
+
+        self._remember(key, row)
+        return row[0], row[1]
+
+    def set(self, location_name, latitude, longitude):
+        """Store coordinates for a location in memory and on disk."""
+        key = normalize_location(location_name)
+        entry = (latitude, longitude, time.time())
+        self._remember(key, entry)
+        if self.backend is not None:
+            self.backend.set("geo:" + key, entry, self.ttl)
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", (key, *entry))
+        except sqlite3.Error as e:
+            print(f"Geocode cache write failed: {e}")
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = tuple(entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop the local entries (the shared backend is left alone)."""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM geocode")
+
+
+geocode_cache = GeocodeCache(db_path=GEOCODE_CACHE_PATH or None, backend=shared_backend)
+
+_in_flight = SingleFlight()  # normalized location -> in-flight lookup
+
+_next_request_at = 0.0  # earliest start of the next Nominatim request
+_slot_lock = threading.Lock()
+
+
+def _reserve_request_slot():
+    """Seconds to wait before the next request, keeping NOMINATIM_MIN_DELAY spacing (Nominatim allows 1 req/s)."""
+    global _next_request_at
+    with _slot_lock:
+        now = time.monotonic()
+        start = max(now, _next_request_at)
+        _next_request_at = start + NOMINATIM_MIN_DELAY
+    return start - now
+
+
+async def ageocode(location_name):
+    """Return (latitude, longitude) for a location name, or None if it is unknown.
+
+    Geocoder errors are raised to the caller; only successful lookups are cached.
+    """
+    coords = await cache_io(geocode_cache.get, location_name, blocking=bool(geocode_cache.db_path))
+    note_cache_event("geocode", coords is not None)
+    if coords is not None:
+        return coords
+    return await _in_flight.arun(normalize_location(location_name), lambda: _alookup(location_name))
+
+
+async def _alookup(location_name):
+    await asyncio.sleep(_reserve_request_slot())
+    results = await async_http.get_json(
+        f"{NOMINATIM_SCHEME}://{NOMINATIM_DOMAIN}/search",
+        {"q": location_name, "format": "json", "limit": 1},
+        headers={"User-Agent": NOMINATIM_USER_AGENT}
+    )
+    if not results:
+        return None
+
+    latitude, longitude = float(results[0]["lat"]), float(results[0]["lon"])
+    await cache_io(geocode_cache.set, location_name, latitude, longitude, blocking=bool(geocode_cache.db_path))
+    return latitude, longitude
+
+
+@timed("get_coordinates")
+async def aget_coordinates(location_name):
+    """Convert location name to coordinates, returning (None, None) when it cannot be found."""
+    try:
+        coords = await ageocode(location_name)
+        if coords:
+            print(f"Coordinates found for {location_name}: ({coords[0]}, {coords[1]})")
+            return coords
+        else:
+            print(f"Location '{location_name}' could not be geocoded.")
+            return None, None
+    except Exception as e:
+        print(f"Geocoding failed for '{location_name}': {e}")
+        count_failure("get_coordinates", e)
+        return None, None
@@ -0,0 +1,244 @@
+"""Chat model selection: Groq, a local Ollama server or an OpenAI-compatible server.
+
+LLM_BACKENDS lists the backends in order of preference, and later entries
+take over when an earlier one fails:
+
+    LLM_BACKENDS=groq           Groq only (default)
+    LLM_BACKENDS=ollama,groq    local Ollama, Groq when the local server fails
+    LLM_BACKENDS=groq,ollama    Groq, local Ollama on rate limits or outages
+    LLM_BACKENDS=openai,groq    any OpenAI-compatible local server (vLLM,
+                                llama.cpp, LM Studio...), then Groq
+
+Local servers are protected by a shared guard. It caps the number of
+concurrent requests. A request that waits longer than
+LOCAL_LLM_QUEUE_TIMEOUT for a slot, or takes longer than LOCAL_LLM_TIMEOUT,
+fails over to the next backend. After LOCAL_LLM_MAX_FAILURES consecutive
+failures the local server is skipped for LOCAL_LLM_COOLDOWN seconds. Ollama
+models are kept loaded with keep_alive and preloaded at startup, so the
+first chat turn does not pay for loading the weights.
+"""
+import asyncio
+import contextlib
+import os
+import threading
+import time
+
+import requests
+
+LLM_BACKENDS = [name.strip().lower() for name in os.environ.get("LLM_BACKENDS", "groq").split(",") if name.strip()]
+GROQ_MODEL = os.environ.get("GROQ_MODEL", "llama-3.3-70b-versatile")
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "llama3.1:8b")
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+# Duration (e.g. "30m") or seconds; -1 keeps the model loaded indefinitely
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+OPENAI_COMPATIBLE_URL = os.environ.get("OPENAI_COMPATIBLE_URL", "http://localhost:8000/v1")
+OPENAI_COMPATIBLE_MODEL = os.environ.get("OPENAI_COMPATIBLE_MODEL", OLLAMA_MODEL)
+OPENAI_COMPATIBLE_API_KEY = os.environ.get("OPENAI_COMPATIBLE_API_KEY", "not-needed")
+
+LOCAL_LLM_CONCURRENCY = int(os.environ.get("LOCAL_LLM_CONCURRENCY", 2))
+LOCAL_LLM_TIMEOUT = float(os.environ.get("LOCAL_LLM_TIMEOUT", 60))  # seconds per request
+LOCAL_LLM_QUEUE_TIMEOUT = float(os.environ.get("LOCAL_LLM_QUEUE_TIMEOUT", 5))  # seconds waiting for a slot
+LOCAL_LLM_MAX_FAILURES = int(os.environ.get("LOCAL_LLM_MAX_FAILURES", 3))
+LOCAL_LLM_COOLDOWN = float(os.environ.get("LOCAL_LLM_COOLDOWN", 60))
+
+
+class LocalLLMUnavailable(RuntimeError):
+    """The local server is saturated or cooling down; the next backend should answer."""
+
+
+class LocalServerGuard:
+    """Concurrency cap and circuit breaker shared by every client of one local server."""
+
+    def __init__(self, name, concurrency=LOCAL_LLM_CONCURRENCY, queue_timeout=LOCAL_LLM_QUEUE_TIMEOUT,
+                 max_failures=LOCAL_LLM_MAX_FAILURES, cooldown=LOCAL_LLM_COOLDOWN):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def _check_closed(self):
+        if time.monotonic() < self._open_until:
+            raise LocalLLMUnavailable(f"{self.name} is skipped after repeated failures")
+
+    def _busy(self):
+        return LocalLLMUnavailable(f"{self.name} is busy ({self.concurrency} requests in flight)")
+
+    def _record(self, error):
+        with self._lock:
+            if error is None:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.max_failures:
+                self._open_until = time.monotonic() + self.cooldown
+                self._failures = 0
+                print(f"{self.name} failed {self.max_failures} times in a row; skipping it for {self.cooldown:.0f}s: {error}")
+            else:
+                print(f"{self.name} request failed: {error}")
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold one request slot for the duration of a call."""
+        self._check_closed()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise self._busy()
+        try:
+            yield
+        except Exception as e:
+            self._record(e)
+            raise
+        else:
+            self._record(None)
+        finally:
+            self._slots.release()
+
+    @contextlib.asynccontextmanager
+    async def aslot(self):
+        """Async slot(); waits for the slot without blocking the event loop."""
+        self._check_closed()
+        if not await asyncio.to_thread(self._slots.acquire, True, self.queue_timeout):
+            raise self._busy()
+        try:
+            yield
+        except Exception as e:
+            self._record(e)
+            raise
+        else:
+            self._record(None)
+        finally:
+            self._slots.release()
+
+
+_guards = {}  # server URL -> LocalServerGuard
+_guards_lock = threading.Lock()
+
+
+def server_guard(url):
+    """The shared guard of a local server."""
+    with _guards_lock:
+        if url not in _guards:
+            _guards[url] = LocalServerGuard(f"Local LLM at {url}")
+        return _guards[url]
+
+
+def _keep_alive(value):
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: seconds as a number, durations as strings."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _ollama_model():
+    from langchain_ollama import ChatOllama
+
+    class GuardedChatOllama(ChatOllama):
+        """ChatOllama whose requests go through the local server guard."""
+
+        def _create_chat_stream(self, *args, **kwargs):
+            with server_guard(self.base_url).slot():
+                yield from super()._create_chat_stream(*args, **kwargs)
+
+        async def _acreate_chat_stream(self, *args, **kwargs):
+            async with server_guard(self.base_url).aslot():
+                async for part in super()._acreate_chat_stream(*args, **kwargs):
+                    yield part
+
+    return GuardedChatOllama(
+        model=OLLAMA_MODEL,
+        base_url=OLLAMA_BASE_URL,
+        keep_alive=_keep_alive(OLLAMA_KEEP_ALIVE),
+        client_kwargs={"timeout": LOCAL_LLM_TIMEOUT}
+    )
+
+
+def _openai_compatible_model():
+    try:
+        from langchain_openai import ChatOpenAI
+    except ImportError:
+        print("langchain-openai is not installed; skipping the OpenAI-compatible backend.")
+        return None
+
+    class GuardedChatOpenAI(ChatOpenAI):
+        """ChatOpenAI against a local server, through the local server guard."""
+
+        def _generate(self, *args, **kwargs):
+            with server_guard(self.openai_api_base).slot():
+                return super()._generate(*args, **kwargs)
+
+        def _stream(self, *args, **kwargs):
+            with server_guard(self.openai_api_base).slot():
+                yield from super()._stream(*args, **kwargs)
+
+        async def _agenerate(self, *args, **kwargs):
+            async with server_guard(self.openai_api_base).aslot():
+                return await super()._agenerate(*args, **kwargs)
+
+        async def _astream(self, *args, **kwargs):
+            async with server_guard(self.openai_api_base).aslot():
+                async for chunk in super()._astream(*args, **kwargs):
+                    yield chunk
+
+    return GuardedChatOpenAI(
+        model=OPENAI_COMPATIBLE_MODEL,
+        base_url=OPENAI_COMPATIBLE_URL,
+        api_key=OPENAI_COMPATIBLE_API_KEY,
+        timeout=LOCAL_LLM_TIMEOUT,
+        max_retries=0
+    )
+
+
+def _groq_model():
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=GROQ_MODEL)
+
+
+_BUILDERS = {
+    "groq": _groq_model,
+    "ollama": _ollama_model,
+    "openai": _openai_compatible_model,
+}
+
+
+def create_chat_model(backends=None):
+    """Chat model for the configured backends, failing over in the listed order."""
+    models = []
+    for name in backends or LLM_BACKENDS:
+        builder = _BUILDERS.get(name)
+        if builder is None:
+            print(f"Unknown LLM backend '{name}'; expected one of {', '.join(_BUILDERS)}.")
+            continue
+        model = builder()
+        if model is not None:
+            models.append(model)
+    if not models:
+        raise ValueError(f"No usable LLM backend in LLM_BACKENDS={','.join(backends or LLM_BACKENDS)}")
+    return models[0].with_fallbacks(models[1:]) if len(models) > 1 else models[0]
+
+
+def preload_local_models(backends=None):
+    """Load the Ollama model in the background so the first chat turn does not wait for it."""
+    if "ollama" not in (backends or LLM_BACKENDS):
+        return None
+
+    def preload():
+        start = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+                json={"model": OLLAMA_MODEL, "keep_alive": _keep_alive(OLLAMA_KEEP_ALIVE)},
+                timeout=LOCAL_LLM_TIMEOUT
+            )
+            response.raise_for_status()
+            print(f"Preloaded {OLLAMA_MODEL} on {OLLAMA_BASE_URL} in {time.perf_counter() - start:.1f}s")
+        except requests.exceptions.RequestException as e:
+            print(f"Preloading {OLLAMA_MODEL} failed: {e}")
+
+    thread = threading.Thread(target=preload, name="llm-preload", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,316 @@
+"""Process-wide timing metrics for upstream calls, fetchers and reruns.
+
+Counters and histograms are kept in memory and rendered in the Prometheus
+text format, so a scraper can alert on upstream latency, error rates, cache
+hit rates and the cost of Streamlit reruns:
+
+    weather_upstream_request_seconds{endpoint}    upstream HTTP latency, retries included
+    weather_upstream_response_bytes{endpoint}     upstream payload sizes
+    weather_upstream_failures_total{endpoint,error}
+    weather_upstream_retries_total{endpoint}
+    weather_function_seconds{function}            @timed fetchers, display functions and reruns
+    weather_function_failures_total{function,error}
+    weather_cache_{hits,misses,shared_hits,coalesced,evictions,entries,bytes}{cache}
+                                                  gauges read from the caches' stats() on each scrape
+
+With METRICS_PORT set, the metrics are served at http://<host>:METRICS_PORT/metrics
+from a background thread. The app also shows them on its ?debug=metrics page.
+"""
+import asyncio
+import bisect
+import contextlib
+import functools
+import http.server
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Port of the Prometheus endpoint; 0 disables it
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}  # label values -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Histogram:
+    """Bucketed observations (cumulative on output) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label values -> [per-bucket counts + overflow, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {count}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {count}"
+
+
+class Gauge:
+    """Values read from callbacks at render time, one callback per label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._functions = {}  # label values -> callable returning the current value
+        self._lock = threading.Lock()
+
+    def set_function(self, function, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._functions[key] = function
+
+    def samples(self):
+        with self._lock:
+            functions = dict(self._functions)
+        for key, function in sorted(functions.items()):
+            value = function()
+            if value is not None:
+                yield f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+
+
+class Registry:
+    """Named metrics, rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_create(Counter, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def gauge(self, name, help, labels=()):
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+upstream_seconds = registry.histogram(
+    "weather_upstream_request_seconds", "Upstream HTTP request latency, retries included.", ("endpoint",)
+)
+upstream_bytes = registry.histogram(
+    "weather_upstream_response_bytes", "Upstream HTTP response body size.", ("endpoint",), SIZE_BUCKETS
+)
+upstream_failures = registry.counter(
+    "weather_upstream_failures_total", "Failed upstream HTTP requests.", ("endpoint", "error")
+)
+upstream_retries = registry.counter(
+    "weather_upstream_retries_total", "Retried upstream HTTP attempts.", ("endpoint",)
+)
+function_seconds = registry.histogram(
+    "weather_function_seconds", "Duration of instrumented fetch, display and rerun functions.", ("function",)
+)
+function_failures = registry.counter(
+    "weather_function_failures_total", "Failures of instrumented functions, raised or reported.", ("function", "error")
+)
+
+# Cache counters; the caches keep them, watch_cache exposes them
+cache_gauges = {
+    stat: registry.gauge(f"weather_cache_{stat}", help, ("cache",))
+    for stat, help in (
+        ("hits", "Lookups answered from this process's cache since it started."),
+        ("misses", "Lookups this process's cache could not answer since it started."),
+        ("shared_hits", "Local misses answered by the shared cache backend since the process started."),
+        ("coalesced", "Misses that waited for an identical in-flight fetch instead of repeating it."),
+        ("evictions", "Entries evicted to stay within the cache bounds."),
+        ("entries", "Entries currently cached."),
+        ("bytes", "Approximate size of the cached entries."),
+    )
+}
+
+
+def watch_cache(cache, stats):
+    """Expose the counters returned by `stats()` (a dict, e.g. ResultCache.stats) as weather_cache_* gauges."""
+    for stat in stats():
+        gauge = cache_gauges.get(stat)
+        if gauge is not None:
+            gauge.set_function(lambda stat=stat: stats().get(stat), cache=cache)
+
+
+def endpoint_label(url):
+    """Host and path of a URL; the query string would make the label unbounded."""
+    parts = urlsplit(url)
+    return parts.netloc + parts.path
+
+
+class _UpstreamCall:
+    size = None
+
+
+@contextlib.contextmanager
+def upstream_call(url):
+    """Time one upstream request; set `.size` on the yielded object to record the payload size."""
+    endpoint = endpoint_label(url)
+    call = _UpstreamCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception as e:
+        upstream_failures.inc(endpoint=endpoint, error=type(e).__name__)
+        raise
+    finally:
+        upstream_seconds.observe(time.perf_counter() - start, endpoint=endpoint)
+        if call.size is not None:
+            upstream_bytes.observe(call.size, endpoint=endpoint)
+
+
+def count_failure(function, error):
+    """Count a failure that was handled (e.g. shown with st.error) rather than raised."""
+    function_failures.inc(function=function, error=type(error).__name__)
+
+
+@contextlib.contextmanager
+def track(function):
+    """Time a block as `function` in weather_function_seconds, counting exceptions."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        count_failure(function, e)
+        raise
+    finally:
+        function_seconds.observe(time.perf_counter() - start, function=function)
+
+
+def timed(name=None):
+    """Decorator: time every call of a sync or async function (see track)."""
+    def decorate(func):
+        function = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with track(function):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(function):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app log
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a daemon thread, once per process; does nothing when port is 0."""
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics endpoint could not listen on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"Serving metrics at http://{host}:{port}/metrics")
+        return _server
@@ -0,0 +1,204 @@
+"""Unified Open-Meteo forecast layer.
+
+One request per location asks for the union of every current, hourly and
+daily variable the dashboard and the agent tools use. The individual views
+(current conditions and dashboard forecast here, the 7-hour and 7-day tool
+slices in components/forecast_store.py) all come from that single payload.
+"""
+import asyncio
+import os
+
+import requests
+
+from components import async_http
+from components.cache import SingleFlight, request_key, response_cache
+from components.cache_backend import cache_io
+from components.metrics import timed, watch_cache
+
+# Overridable so benchmarks can point the app at a local stand-in server
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+AIR_QUALITY_URL = os.environ.get("OPEN_METEO_AIR_QUALITY_URL", "https://air-quality-api.open-meteo.com/v1/air-quality")
+
+CURRENT_METRICS = [
+    "temperature_2m", "relative_humidity_2m",
+    "apparent_temperature", "precipitation",
+    "rain", "weathercode", "cloudcover",
+    "windspeed_10m", "winddirection_10m",
+    "pressure_msl", "visibility", "uv_index"
+]
+
+HOURLY_METRICS = [
+    "temperature_2m",
+    "precipitation_probability",
+    "cloudcover", "weathercode",
+    "windspeed_10m"
+]
+
+DAILY_METRICS = [
+    "temperature_2m_max", "temperature_2m_min",
+    "precipitation_sum",
+    "weathercode", "sunrise", "sunset",
+    "windspeed_10m_max"
+]
+
+# Subset of the daily variables returned by the 7-day agent tool
+WEEKLY_TOOL_METRICS = [
+    "temperature_2m_max", "temperature_2m_min",
+    "precipitation_sum", "weathercode", "windspeed_10m_max"
+]
+
+HOURLY_AQ_METRICS = [
+    "pm10", "pm2_5", "european_aqi", "carbon_monoxide",
+    "nitrogen_dioxide", "sulphur_dioxide", "ozone"
+]
+
+FORECAST_DAYS = 7
+
+# Locations per multi-coordinate request in batch mode
+BATCH_SIZE = int(os.environ.get("OPEN_METEO_BATCH_SIZE", 25))
+
+SECTIONS = ("current", "hourly", "daily")
+
+_in_flight = SingleFlight()  # identical concurrent upstream requests share one call
+watch_cache("response", lambda: {**response_cache.stats(), "coalesced": _in_flight.coalesced})
+
+
+async def _arequest(url, params):
+    return await _in_flight.arun(request_key(url, params), lambda: async_http.get_json(url, params))
+
+
+async def aget_json(url, params):
+    """GET an Open-Meteo endpoint, answering from the shared response cache when possible.
+
+    Concurrent identical requests that miss the cache are coalesced into one.
+    """
+    data = await cache_io(response_cache.lookup, url, params)
+    if data is not None:
+        return data
+    data = await _arequest(url, params)
+    await cache_io(response_cache.store, url, params, data)
+    return data
+
+
+def forecast_params(lat, lon):
+    """Request parameters for the superset forecast payload."""
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "current": ",".join(CURRENT_METRICS),
+        "hourly": ",".join(HOURLY_METRICS),
+        "daily": ",".join(DAILY_METRICS),
+        "timezone": "auto",
+        "forecast_days": FORECAST_DAYS
+    }
+
+
+def air_quality_params(lat, lon):
+    """Request parameters for the hourly air quality payload."""
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "hourly": ",".join(HOURLY_AQ_METRICS),
+        "timezone": "auto"
+    }
+
+
+@timed("fetch_forecast_bundle")
+async def afetch_forecast_bundle(lat, lon):
+    """Fetch current, hourly and daily data for a location in one request.
+
+    Raises requests.exceptions.RequestException on failure.
+    """
+    return await aget_json(FORECAST_URL, forecast_params(lat, lon))
+
+
+@timed("fetch_air_quality_data")
+async def afetch_air_quality_data(lat, lon):
+    """Fetch hourly air quality data. Raises requests.exceptions.RequestException on failure."""
+    return await aget_json(AIR_QUALITY_URL, air_quality_params(lat, lon))
+
+
+def _split_cached(url, params_for, points):
+    """Results list pre-filled from the response cache, and the indices still missing."""
+    results = [None] * len(points)
+    missing = []
+    for i, (lat, lon) in enumerate(points):
+        cached = response_cache.lookup(url, params_for(lat, lon))
+        if cached is not None:
+            results[i] = cached
+        else:
+            missing.append(i)
+    return results, missing
+
+
+def _chunk_params(params_for, points, chunk):
+    return params_for(
+        ",".join(str(points[i][0]) for i in chunk),
+        ",".join(str(points[i][1]) for i in chunk)
+    )
+
+
+def _store_chunk(url, params_for, points, chunk, data, results):
+    if isinstance(data, dict):  # single location responses are not wrapped in a list
+        data = [data]
+    for i, payload in zip(chunk, data):
+        results[i] = payload
+        response_cache.store(url, params_for(*points[i]), payload)
+
+
+async def _afetch_batch(url, params_for, points, batch_size=BATCH_SIZE):
+    """Fetch one payload per (lat, lon) point using chunked multi-coordinate requests.
+
+    Open-Meteo accepts comma-separated latitude/longitude lists and answers with a
+    list of payloads in the same order. Points already in the response cache are
+    not re-requested, the chunk requests run concurrently, and every fetched
+    payload is cached under its own point. Returns a list aligned with `points`;
+    entries of failed chunks are None.
+    """
+    results, missing = await cache_io(_split_cached, url, params_for, points)
+    chunks = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    responses = await asyncio.gather(
+        *(_arequest(url, _chunk_params(params_for, points, chunk)) for chunk in chunks),
+        return_exceptions=True
+    )
+    for chunk, data in zip(chunks, responses):
+        if isinstance(data, requests.exceptions.RequestException):
+            print(f"Batch request for {len(chunk)} locations failed: {data}")
+            continue
+        if isinstance(data, BaseException):
+            raise data
+        await cache_io(_store_chunk, url, params_for, points, chunk, data, results)
+    return results
+
+
+async def afetch_forecast_batch(points):
+    """Forecast bundles for a list of (lat, lon) points, None where a chunk failed."""
+    return await _afetch_batch(FORECAST_URL, forecast_params, points)
+
+
+async def afetch_air_quality_batch(points):
+    """Air quality payloads for a list of (lat, lon) points, None where a chunk failed."""
+    return await _afetch_batch(AIR_QUALITY_URL, air_quality_params, points)
+
+
+def _view(bundle, sections):
+    """Copy of the payload metadata plus the given sections (and their units)."""
+    view = {k: v for k, v in bundle.items()
+            if k not in SECTIONS and not k.endswith("_units")}
+    for section in sections:
+        if section in bundle:
+            view[section] = bundle[section]
+        if f"{section}_units" in bundle:
+            view[f"{section}_units"] = bundle[f"{section}_units"]
+    return view
+
+
+def current_view(bundle):
+    """Current conditions, shaped like a `current=` only response."""
+    return _view(bundle, ["current"])
+
+
+def forecast_view(bundle):
+    """Hourly and daily forecast, shaped like the dashboard forecast response."""
+    return _view(bundle, ["hourly", "daily"])
+
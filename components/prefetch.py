@@ -0,0 +1,157 @@
+"""Warm weather data for the most searched locations.
+
+Users ask for the same few dozen places all day. Every search is counted,
+and a background thread re-fetches current, forecast and air-quality data
+for the top locations just after each forecast-refresh boundary (batched
+into multi-coordinate requests), so those searches are answered from memory
+instead of waiting on Open-Meteo. Snapshots carry the time they were fetched
+so the dashboard can show how fresh they are.
+"""
+import heapq
+import os
+import threading
+import time
+
+from components.async_http import run_sync
+from components.cache import FORECAST_REFRESH_SECONDS
+from components.geocoding import normalize_location
+from components.weather_data import fetch_weather_snapshots
+
+# Locations kept warm; 0 disables the background refresh
+PREFETCH_TOP_K = int(os.environ.get("PREFETCH_TOP_K", 30))
+PREFETCH_INTERVAL = float(os.environ.get("PREFETCH_INTERVAL", FORECAST_REFRESH_SECONDS))
+# Warm snapshots older than this are not served (e.g. when refreshes keep failing)
+PREFETCH_MAX_AGE = float(os.environ.get("PREFETCH_MAX_AGE", 2 * PREFETCH_INTERVAL))
+# Locations whose search counts are tracked before the least popular are forgotten
+PREFETCH_MAX_TRACKED = int(os.environ.get("PREFETCH_MAX_TRACKED", 1000))
+# Popularity is multiplied by this after every refresh so recent searches weigh more
+PREFETCH_DECAY = float(os.environ.get("PREFETCH_DECAY", 0.9))
+
+
+def data_age_label(snapshot, now=None):
+    """Human-readable age of a snapshot, e.g. 'Updated 4 min ago'."""
+    fetched_at = snapshot.get("fetched_at")
+    if not fetched_at:
+        return ""
+    age = max(0, (now or time.time()) - fetched_at)
+    if age < 60:
+        text = "Updated just now"
+    elif age < 3600:
+        text = f"Updated {int(age // 60)} min ago"
+    else:
+        text = f"Updated {age / 3600:.1f} h ago"
+    if snapshot.get("prefetched"):
+        text += " · kept warm in the background"
+    return text
+
+
+class LocationPrefetcher:
+    """Tracks search popularity and keeps the top locations' weather data warm."""
+
+    def __init__(self, top_k=PREFETCH_TOP_K, interval=PREFETCH_INTERVAL, max_age=PREFETCH_MAX_AGE,
+                 max_tracked=PREFETCH_MAX_TRACKED, decay=PREFETCH_DECAY):
+        self.top_k = top_k
+        self.interval = interval
+        self.max_age = max_age
+        self.max_tracked = max_tracked
+        self.decay = decay
+        self._scores = {}  # key -> popularity
+        self._names = {}  # key -> location name as last searched
+        self._warm = {}  # key -> snapshot
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, location_name):
+        """Count one search for a location."""
+        key = normalize_location(location_name)
+        if not key:
+            return
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0) + 1
+            self._names[key] = location_name.strip()
+            if len(self._scores) > self.max_tracked:
+                # Never the location just searched, or new locations could not get in once scores grow
+                least = min((other for other in self._scores if other != key), key=self._scores.get)
+                for mapping in (self._scores, self._names, self._warm):
+                    mapping.pop(least, None)
+
+    def get(self, location_name):
+        """Warm snapshot for a location, or None when missing or too old."""
+        key = normalize_location(location_name)
+        with self._lock:
+            snapshot = self._warm.get(key)
+        if snapshot is None or time.time() - snapshot["fetched_at"] > self.max_age:
+            return None
+        return snapshot
+
+    def _top_keys(self):
+        return heapq.nlargest(self.top_k, self._scores, key=self._scores.get)
+
+    def store(self, location_name, snapshot):
+        """Keep a freshly fetched snapshot if the location is currently in the top K."""
+        key = normalize_location(location_name)
+        with self._lock:
+            if key in self._top_keys():
+                self._warm[key] = snapshot
+
+    def top(self):
+        """The `top_k` most popular locations, most popular first."""
+        with self._lock:
+            return [self._names[key] for key in self._top_keys()]
+
+    def refresh(self):
+        """Re-fetch the top locations with one batched request per endpoint."""
+        names = self.top()
+        if not names:
+            return 0
+
+        start = time.perf_counter()
+        snapshots = run_sync(fetch_weather_snapshots(names))
+        elapsed = time.perf_counter() - start
+        fetched = {name: snapshot for name, snapshot in snapshots.items()
+                   if snapshot is not None and snapshot["current"] is not None}
+
+        with self._lock:
+            for name, snapshot in fetched.items():
+                snapshot["prefetched"] = True
+                self._warm[normalize_location(name)] = snapshot
+
+            # Only the current top locations stay warm
+            top_keys = {normalize_location(name) for name in names}
+            for key in [key for key in self._warm if key not in top_keys]:
+                del self._warm[key]
+            for key in self._scores:
+                self._scores[key] *= self.decay
+
+        print(f"Prefetched weather for {len(fetched)} locations in {elapsed * 1000:.0f}ms")
+        return len(fetched)
+
+    def _seconds_to_next_refresh(self):
+        now = time.time()
+        # One second past the boundary, once the response cache entries have expired
+        return (now // self.interval + 1) * self.interval + 1 - now
+
+    def _run(self):
+        while not self._stop.wait(self._seconds_to_next_refresh()):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Prefetch failed: {e}")
+
+    def start(self):
+        """Start the background refresh thread once per process."""
+        if self.top_k <= 0:
+            return self
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+location_prefetcher = LocationPrefetcher()
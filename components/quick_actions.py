@@ -0,0 +1,268 @@
+"""Rule-based answers for the chat panel's quick-action buttons.
+
+The four buttons send fixed questions about the dashboard location, and the
+data needed to answer them is already in the session's weather snapshot.
+They are answered here from templates in milliseconds; free-text questions
+(and button questions when the snapshot lacks the data) still go to the LLM.
+"""
+from components.charts import aqi_category
+from components.forecast_store import forecast_store
+from components.weather_codes import get_short_label, get_weather_description
+
+# intent -> button question; the location is the dashboard location
+QUICK_ACTIONS = {
+    "hourly": "Show me the hourly forecast for {location}",
+    "daily": "What's the weekly forecast for {location}?",
+    "alerts": "Are there any weather warnings or hazards I should know about in {location}?",
+    "clothing": "What should I wear today in {location}?",
+}
+
+HOURS_AHEAD = 7
+ALERT_HOURS = 24
+
+THUNDERSTORM_CODES = {95, 96, 99}
+FREEZING_CODES = {56, 57, 66, 67}
+SNOW_CODES = {71, 73, 75, 77, 85, 86}
+
+# Alert thresholds (metric units, as requested from Open-Meteo)
+STRONG_WIND_KMH = 40
+HEAVY_RAIN_MM = 10
+LIKELY_RAIN_PCT = 60
+HEAT_C = 32
+FROST_C = 0
+HIGH_UV = 6
+VERY_HIGH_UV = 8
+FOG_VISIBILITY_M = 1000
+POOR_AQI = 100
+
+# (upper bound of feels-like °C, base outfit)
+CLOTHING_BANDS = [
+    (0, "a heavy winter coat, hat, scarf and gloves"),
+    (10, "a warm coat over a sweater"),
+    (16, "a light jacket or a sweater"),
+    (22, "a long-sleeve top or a t-shirt with a light layer"),
+    (28, "a t-shirt and breathable trousers or shorts"),
+    (float("inf"), "light, loose, breathable clothing"),
+]
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def quick_action_query(intent, location):
+    """The question a quick-action button sends for the dashboard location."""
+    return QUICK_ACTIONS[intent].format(location=location)
+
+
+def match_quick_action(query, location):
+    """Intent of a quick-action question about `location`, or None for anything else."""
+    normalized = _normalize(query)
+    for intent in QUICK_ACTIONS:
+        if normalized == _normalize(quick_action_query(intent, location)):
+            return intent
+    return None
+
+
+def _number(value, default=None):
+    return default if value is None or value != value else value  # NaN check
+
+
+def _hourly_answer(location, store):
+    hours = store.next_hours(HOURS_AHEAD)
+    if hours.empty or "temperature_2m" not in hours:
+        return None
+    temperature_unit = store.hourly_units.get("temperature_2m", "°C")
+    wind_unit = store.hourly_units.get("windspeed_10m", "km/h")
+
+    lines = [f"Here's the next {len(hours)} hours in {location}:"]
+    for row in hours.itertuples(index=False):
+        icon = get_weather_description(getattr(row, "weathercode", None))["icon"]
+        line = f"{row.time:%H:%M} {icon} {row.temperature_2m:.1f}{temperature_unit}"
+        if "precipitation_probability" in hours:
+            line += f" · 💧 {row.precipitation_probability:.0f}%"
+        if "windspeed_10m" in hours:
+            line += f" · 💨 {row.windspeed_10m:.0f} {wind_unit}"
+        lines.append(line)
+
+    warmest = hours.loc[hours["temperature_2m"].idxmax()]
+    coolest = hours.loc[hours["temperature_2m"].idxmin()]
+    lines.append("")
+    lines.append(
+        f"🌡️ Temperature: {coolest['temperature_2m']:.1f}–{warmest['temperature_2m']:.1f}{temperature_unit}"
+        f" → warmest around {warmest['time']:%H:%M}"
+    )
+    if "precipitation_probability" in hours:
+        wettest = hours.loc[hours["precipitation_probability"].idxmax()]
+        chance = wettest["precipitation_probability"]
+        if chance >= LIKELY_RAIN_PCT:
+            lines.append(f"⚠️ Rain: {chance:.0f}% chance around {wettest['time']:%H:%M} → likely wet ✓ Keep an umbrella handy")
+        elif chance >= 30:
+            lines.append(f"🌦️ Rain: up to {chance:.0f}% around {wettest['time']:%H:%M} → possible showers ✓ A light rain layer helps")
+        else:
+            lines.append(f"☀️ Rain: at most {chance:.0f}% → dry spell ✓ Good window for outdoor plans")
+    return "\n".join(lines)
+
+
+def _daily_answer(location, store):
+    daily = store.daily
+    if daily.empty or "temperature_2m_max" not in daily:
+        return None
+    unit = store.daily_units.get("temperature_2m_max", "°C")
+    precipitation_unit = store.daily_units.get("precipitation_sum", "mm")
+    precipitation = daily["precipitation_sum"] if "precipitation_sum" in daily else None
+
+    lines = [f"Here's the 7-day outlook for {location}:"]
+    for _, row in daily.head(7).iterrows():
+        icon = get_weather_description(row.get("weathercode"))["icon"]
+        line = f"{row['time']:%a %d %b} {icon} {row['temperature_2m_max']:.1f}° / {row['temperature_2m_min']:.1f}{unit}"
+        if precipitation is not None:
+            line += f" · 💧 {_number(row['precipitation_sum'], 0):.1f} {precipitation_unit}"
+        lines.append(line)
+
+    week = daily.head(7)
+    hottest = week.loc[week["temperature_2m_max"].idxmax()]
+    lines.append("")
+    lines.append(f"🌡️ Warmest: {hottest['time']:%A} at {hottest['temperature_2m_max']:.1f}{unit}")
+    if precipitation is not None:
+        wettest = week.loc[week["precipitation_sum"].fillna(0).idxmax()]
+        wettest_total = _number(wettest["precipitation_sum"], 0)
+        if wettest_total >= 1:
+            lines.append(
+                f"🌧️ Wettest: {wettest['time']:%A} with {wettest_total:.1f} {precipitation_unit}"
+                " ✓ Plan indoor alternatives"
+            )
+        best = week.assign(_rain=week["precipitation_sum"].fillna(0)).sort_values(
+            ["_rain", "temperature_2m_max"], ascending=[True, False]
+        ).iloc[0]
+        lines.append(f"✓ Best day for outdoor plans: {best['time']:%A}.")
+    return "\n".join(lines)
+
+
+def _alerts(store, air_quality_store):
+    """⚠️ lines for hazards in the current conditions, the next 24 hours and today's totals."""
+    current = store.current
+    units = store.current_units
+    hours = store.next_hours(ALERT_HOURS)
+    alerts = []
+
+    codes = set(hours["weathercode"].dropna().astype(int)) if "weathercode" in hours else set()
+    codes.add(_number(current.get("weathercode"), -1))
+    if codes & THUNDERSTORM_CODES:
+        alerts.append("⚠️ Thunderstorms expected → lightning and sudden downpours ✓ Stay indoors during storms")
+    if codes & FREEZING_CODES:
+        alerts.append("⚠️ Freezing rain or drizzle → icy roads and pavements ✓ Allow extra travel time")
+    if codes & SNOW_CODES:
+        alerts.append("⚠️ Snow expected → slippery conditions ✓ Wear boots with good grip")
+
+    wind = max([_number(current.get("windspeed_10m"), 0)]
+               + (hours["windspeed_10m"].dropna().tolist() if "windspeed_10m" in hours else []))
+    if wind >= STRONG_WIND_KMH:
+        alerts.append(f"⚠️ Wind: up to {wind:.0f} {units.get('windspeed_10m', 'km/h')} → gusty conditions ✓ Secure loose items")
+
+    if "precipitation_sum" in store.daily and not store.daily.empty:
+        today_rain = _number(store.daily["precipitation_sum"].iloc[0], 0)
+        if today_rain >= HEAVY_RAIN_MM:
+            alerts.append(f"⚠️ Rain: {today_rain:.1f} mm today → possible flooding on roads ✓ Carry an umbrella")
+
+    feels_like = _number(current.get("apparent_temperature"))
+    temperature_unit = units.get("apparent_temperature", "°C")
+    if feels_like is not None and feels_like >= HEAT_C:
+        alerts.append(f"⚠️ Heat: feels like {feels_like:.1f}{temperature_unit} → heat stress risk ✓ Stay hydrated and seek shade")
+    if feels_like is not None and feels_like <= FROST_C:
+        alerts.append(f"⚠️ Cold: feels like {feels_like:.1f}{temperature_unit} → frost and ice risk ✓ Dress in warm layers")
+
+    uv = _number(current.get("uv_index"))
+    if uv is not None and uv >= VERY_HIGH_UV:
+        alerts.append(f"⚠️ UV index: {uv:.0f} (very high) → skin burns quickly ✓ Use SPF 30+ and avoid midday sun")
+    elif uv is not None and uv >= HIGH_UV:
+        alerts.append(f"⚠️ UV index: {uv:.0f} (high) → sunburn risk ✓ Wear sunscreen and sunglasses")
+
+    visibility = _number(current.get("visibility"))
+    if visibility is not None and visibility < FOG_VISIBILITY_M:
+        alerts.append(f"⚠️ Visibility: {visibility:.0f} m → fog ✓ Drive slowly with low beams")
+
+    if air_quality_store is not None:
+        aqi = air_quality_store.first("european_aqi")
+        if aqi is not None and aqi >= POOR_AQI:
+            info = aqi_category(aqi)
+            alerts.append(f"⚠️ Air quality: AQI {aqi:.0f} ({info['category']}) → {info['description']}")
+    return alerts
+
+
+def _alerts_answer(location, store, air_quality_store):
+    if not store.current:
+        return None
+    alerts = _alerts(store, air_quality_store)
+    condition = get_weather_description(store.current.get("weathercode"))
+    if not alerts:
+        return (
+            f"No weather warnings or hazards for {location} right now. "
+            f"Conditions are {condition['description'].lower()} {condition['icon']} "
+            "with nothing severe expected in the next 24 hours.\n"
+            "✓ A good time to get outside."
+        )
+    things = "thing" if len(alerts) == 1 else "things"
+    return "\n".join([f"Heads up for {location}: {len(alerts)} {things} to watch in the next 24 hours."] + alerts)
+
+
+def _clothing_answer(location, store):
+    current = store.current
+    feels_like = _number(current.get("apparent_temperature"), _number(current.get("temperature_2m")))
+    if feels_like is None:
+        return None
+    unit = store.current_units.get("apparent_temperature", "°C")
+    outfit = next(outfit for limit, outfit in CLOTHING_BANDS if feels_like < limit)
+    label = get_short_label(current.get("weathercode"))
+
+    hours = store.next_hours(12)
+    rain_chance = hours["precipitation_probability"].max() if "precipitation_probability" in hours and not hours.empty else 0
+    codes = set(hours["weathercode"].dropna().astype(int)) if "weathercode" in hours else set()
+
+    lines = [f"It feels like {feels_like:.1f}{unit} in {location} ({label}), so go for {outfit}."]
+    if _number(current.get("precipitation"), 0) > 0 or _number(rain_chance, 0) >= 40:
+        lines.append(f"🌧️ Rain: up to {_number(rain_chance, 0):.0f}% chance today ✓ Bring a waterproof jacket or umbrella")
+    if codes & SNOW_CODES:
+        lines.append("❄️ Snow: expected later ✓ Waterproof boots with good grip")
+    wind = _number(current.get("windspeed_10m"), 0)
+    if wind >= 30:
+        lines.append(f"💨 Wind: {wind:.0f} {store.current_units.get('windspeed_10m', 'km/h')} ✓ Add a windproof layer")
+    uv = _number(current.get("uv_index"), 0)
+    if uv >= HIGH_UV:
+        lines.append(f"☀️ UV index: {uv:.0f} ✓ Sunglasses, a hat and sunscreen")
+    return "\n".join(lines)
+
+
+def answer_quick_action(intent, weather_data):
+    """Template answer for a quick-action intent, or None when the snapshot lacks the data."""
+    if not weather_data or not weather_data.get("current"):
+        return None
+    store = weather_data.get("forecast_store")
+    if store is None:
+        bundle = dict(weather_data.get("forecast") or {}, **weather_data["current"])
+        store = forecast_store(bundle)
+    location = weather_data["location"]
+
+    if intent == "hourly":
+        return _hourly_answer(location, store)
+    if intent == "daily":
+        return _daily_answer(location, store)
+    if intent == "alerts":
+        return _alerts_answer(location, store, weather_data.get("air_quality_store"))
+    if intent == "clothing":
+        return _clothing_answer(location, store)
+    return None
+
+
+def route_quick_action(query, weather_data):
+    """Answer a quick-action question from the dashboard snapshot, or None to use the LLM."""
+    if not weather_data:
+        return None
+    intent = match_quick_action(query, weather_data.get("location", ""))
+    if intent is None:
+        return None
+    try:
+        return answer_quick_action(intent, weather_data)
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"Quick action '{intent}' fell back to the agent: {e}")
+        return None
@@ -0,0 +1,163 @@
+"""Compact text encodings of weather data for agent tool results.
+
+Tool results stay in the ReAct history and are resent with every later turn,
+so instead of JSON with unit-suffixed keys they are written as small
+pipe-separated tables: short column names with the unit declared once in the
+header, values rounded to what an answer needs and weather codes as short
+labels. Token counts per result are tracked so growth is visible in the logs.
+"""
+import threading
+from datetime import datetime
+
+from langchain_core.messages.utils import count_tokens_approximately
+
+from components.weather_codes import get_short_label
+
+# API variable -> (column name, decimal places)
+COLUMNS = {
+    "temperature_2m": ("temp", 1),
+    "apparent_temperature": ("feels", 1),
+    "temperature_2m_max": ("max", 1),
+    "temperature_2m_min": ("min", 1),
+    "relative_humidity_2m": ("humidity", 0),
+    "precipitation_probability": ("rain chance", 0),
+    "precipitation": ("precip", 1),
+    "precipitation_sum": ("precip", 1),
+    "rain": ("rain", 1),
+    "cloudcover": ("cloud", 0),
+    "windspeed_10m": ("wind", 0),
+    "windspeed_10m_max": ("wind max", 0),
+    "winddirection_10m": ("wind dir", 0),
+    "pressure_msl": ("pressure", 0),
+    "visibility": ("visibility", 1),
+    "uv_index": ("uv", 1),
+    "weathercode": ("sky", None)
+}
+
+# Units rewritten before they are declared in a header
+_UNIT_SCALES = {"m": ("km", 0.001)}
+
+
+def _round(value, places):
+    if value is None or value != value:  # missing or NaN
+        return "-"
+    value = round(value, places)
+    if places == 0 or value == int(value):
+        return str(int(value))
+    return str(value)
+
+
+def _column(variable, unit):
+    """Header label and a cell formatter for one API variable."""
+    name, places = COLUMNS.get(variable, (variable, 1))
+    if variable == "weathercode":
+        return name, get_short_label
+    unit, scale = _UNIT_SCALES.get(unit, (unit, 1))
+    label = f"{name} {unit}".strip() if unit else name
+    return label, lambda value: _round(value * scale if value is not None else None, places)
+
+
+def _time_label(value, fmt):
+    if hasattr(value, "strftime"):
+        return value.strftime(fmt)
+    try:
+        return datetime.fromisoformat(value).strftime(fmt)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _location_label(location_name, data):
+    return f"{location_name} ({data['latitude']:.2f},{data['longitude']:.2f} {data['timezone']})"
+
+
+def encode_table(title, series, units, time_format=None):
+    """Render columnar series ({variable: [values]}, plus optional 'time') as a text table."""
+    variables = [key for key in series if key != "time"]
+    columns = [_column(variable, units.get(variable, "")) for variable in variables]
+    header = [label for label, _ in columns]
+    rows = []
+    if "time" in series:
+        header.insert(0, "time")
+    for i in range(max((len(values) for values in series.values()), default=0)):
+        row = [fmt(series[variable][i]) for variable, (_, fmt) in zip(variables, columns)]
+        if "time" in series:
+            row.insert(0, _time_label(series["time"][i], time_format))
+        rows.append("|".join(row))
+    return "\n".join([title, "|".join(header)] + rows)
+
+
+def encode_hourly(location_name, data, hourly):
+    """Hourly forecast rows labelled by weekday and local hour."""
+    title = f"{_location_label(location_name, data)} hourly forecast"
+    return encode_table(title, hourly, data.get("hourly_units", {}), "%a %H:%M")
+
+
+def encode_daily(location_name, data, daily):
+    """Daily forecast rows labelled by weekday and date."""
+    title = f"{_location_label(location_name, data)} daily forecast"
+    return encode_table(title, daily, data.get("daily_units", {}), "%a %d %b")
+
+
+def _current_series(current):
+    return {key: [value] for key, value in current.items() if key not in ("time", "interval")}
+
+
+def encode_current(location_name, data):
+    """Current conditions as a one-row table."""
+    title = f"{_location_label(location_name, data)} current, {_time_label(data['current']['time'], '%a %H:%M')}"
+    return encode_table(title, _current_series(data["current"]), data.get("current_units", {}))
+
+
+def encode_current_comparison(current_by_location):
+    """Current conditions of several locations, one row each.
+
+    `current_by_location` maps a location name to a current-weather view or an
+    error string.
+    """
+    header, rows, errors = None, [], []
+    for name, data in current_by_location.items():
+        if isinstance(data, str):
+            errors.append(f"{name}: {data}")
+            continue
+        table = encode_table("", _current_series(data["current"]), data.get("current_units", {}))
+        _, columns, values = table.split("\n")
+        header = header or f"location|{columns}"
+        rows.append(f"{name}|{values}")
+    lines = ["Current weather by location"]
+    if header:
+        lines += [header] + rows
+    return "\n".join(lines + errors)
+
+
+class ToolTokenStats:
+    """Approximate prompt tokens added by each tool's results."""
+
+    def __init__(self):
+        self._stats = {}  # tool name -> {"calls", "tokens", "max"}
+        self._lock = threading.Lock()
+
+    def record(self, tool_name, content):
+        """Count the tokens of one tool result and return the count."""
+        tokens = count_tokens_approximately([content if isinstance(content, str) else str(content)])
+        with self._lock:
+            stats = self._stats.setdefault(tool_name, {"calls": 0, "tokens": 0, "max": 0})
+            stats["calls"] += 1
+            stats["tokens"] += tokens
+            stats["max"] = max(stats["max"], tokens)
+        print(f"Tool result {tool_name}: ~{tokens} tokens")
+        return tokens
+
+    def snapshot(self):
+        """Per-tool calls, total, mean and max tokens."""
+        with self._lock:
+            return {
+                name: {**stats, "mean": stats["tokens"] / stats["calls"]}
+                for name, stats in self._stats.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+
+tool_token_stats = ToolTokenStats()
@@ -0,0 +1,66 @@
+"""WMO weather code lookup shared by the dashboard and the agent.
+
+WMO codes are small integers (0-99), so lookups index dense tables built
+once at import instead of rebuilding a dict on every call.
+"""
+from numbers import Real
+
+# code: (description, icon, short label for agent tool results)
+_WMO_CODES = {
+    0: ("Clear sky", "☀️", "clear"),
+    1: ("Mainly clear", "🌤️", "mostly clear"),
+    2: ("Partly cloudy", "⛅", "partly cloudy"),
+    3: ("Overcast", "☁️", "overcast"),
+    45: ("Fog", "🌫️", "fog"),
+    48: ("Depositing rime fog", "🌫️", "rime fog"),
+    51: ("Light drizzle", "🌦️", "light drizzle"),
+    53: ("Moderate drizzle", "🌧️", "drizzle"),
+    55: ("Dense drizzle", "🌧️", "dense drizzle"),
+    56: ("Light freezing drizzle", "🌨️", "light freezing drizzle"),
+    57: ("Dense freezing drizzle", "🌨️", "freezing drizzle"),
+    61: ("Slight rain", "🌦️", "light rain"),
+    63: ("Moderate rain", "🌧️", "rain"),
+    65: ("Heavy rain", "🌧️", "heavy rain"),
+    66: ("Light freezing rain", "🌨️", "light freezing rain"),
+    67: ("Heavy freezing rain", "🌨️", "freezing rain"),
+    71: ("Slight snow fall", "🌨️", "light snow"),
+    73: ("Moderate snow fall", "🌨️", "snow"),
+    75: ("Heavy snow fall", "❄️", "heavy snow"),
+    77: ("Snow grains", "❄️", "snow grains"),
+    80: ("Slight rain showers", "🌦️", "light showers"),
+    81: ("Moderate rain showers", "🌧️", "showers"),
+    82: ("Violent rain showers", "⛈️", "violent showers"),
+    85: ("Slight snow showers", "🌨️", "snow showers"),
+    86: ("Heavy snow showers", "❄️", "heavy snow showers"),
+    95: ("Thunderstorm", "⛈️", "thunderstorm"),
+    96: ("Thunderstorm with slight hail", "⛈️", "thunderstorm, hail"),
+    99: ("Thunderstorm with heavy hail", "⛈️", "thunderstorm, heavy hail")
+}
+
+UNKNOWN_WEATHER = {"description": "Unknown", "icon": "❓"}
+
+# Indexed by WMO code; entries are shared, so callers must not mutate them
+WEATHER_CODE_TABLE = tuple(
+    {"description": _WMO_CODES[code][0], "icon": _WMO_CODES[code][1]} if code in _WMO_CODES else UNKNOWN_WEATHER
+    for code in range(100)
+)
+SHORT_LABEL_TABLE = tuple(_WMO_CODES[code][2] if code in _WMO_CODES else "unknown" for code in range(100))
+
+
+def _index(code):
+    """Table index of a numeric WMO code (ints and whole floats), or None."""
+    if isinstance(code, Real) and 0 <= code < 100 and code == int(code):
+        return int(code)
+    return None
+
+
+def get_weather_description(code):
+    """Map a WMO weather code to a description and icon."""
+    index = _index(code)
+    return UNKNOWN_WEATHER if index is None else WEATHER_CODE_TABLE[index]
+
+
+def get_short_label(code):
+    """Short lowercase label for a WMO weather code."""
+    index = _index(code)
+    return "unknown" if index is None else SHORT_LABEL_TABLE[index]
@@ -0,0 +1,117 @@
+"""Dashboard weather snapshots and the async pipeline that fetches them.
+
+A snapshot is the per-location dict kept in session state (and in the
+prefetcher's warm set). The fetch coroutines geocode and then query the
+forecast and air-quality endpoints concurrently on the asyncio client;
+sync callers run them through components.async_http.run_sync.
+
+Complete snapshots are shared across sessions through a process-wide
+ResultCache keyed on the normalized location, so N users looking at the
+same city cost one set of upstream calls per forecast-refresh window, and
+simultaneous first requests are coalesced into one fetch.
+"""
+import asyncio
+import time
+
+import requests
+
+from components.async_http import gather_timed
+from components.cache import ResultCache
+from components.forecast_store import AirQualityStore, forecast_store
+from components.geocoding import aget_coordinates, normalize_location
+from components.metrics import timed, watch_cache
+from components.open_meteo import (
+    afetch_air_quality_batch, afetch_air_quality_data, afetch_forecast_batch,
+    afetch_forecast_bundle, current_view, forecast_view
+)
+
+snapshot_cache = ResultCache()
+watch_cache("snapshot", snapshot_cache.stats)
+
+
+def weather_snapshot(location_name, lat, lon, bundle, air_quality, timings=None, fetched_at=None):
+    """Dashboard weather data for one location, as kept in session state.
+
+    The raw payloads are kept for the agent context; the tabs read the
+    columnar stores, which are parsed here once per fetch.
+    """
+    return {
+        "location": location_name,
+        "latitude": lat,
+        "longitude": lon,
+        "current": current_view(bundle) if bundle else None,
+        "forecast": forecast_view(bundle) if bundle else None,
+        "air_quality": air_quality,
+        "forecast_store": forecast_store(bundle) if bundle else None,
+        "air_quality_store": AirQualityStore(air_quality) if air_quality else None,
+        "timings": timings or {},
+        "fetched_at": fetched_at or time.time()
+    }
+
+
+def _split_errors(results):
+    """Replace failed results with None and return the request errors by endpoint."""
+    errors = {}
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            if not isinstance(result, requests.exceptions.RequestException):
+                print(f"Fetcher {name} failed: {result}")
+            errors[name] = result
+            results[name] = None
+    return errors
+
+
+@timed()
+async def fetch_weather_snapshot(location_name):
+    """Geocode a location, then fetch its forecast and air quality concurrently.
+
+    Returns (snapshot, errors): the snapshot is None when the location cannot
+    be geocoded, and `errors` maps a failed endpoint to its exception. Only
+    complete snapshots are cached; each caller gets its own shallow copy.
+    """
+    snapshot, errors = await snapshot_cache.aget_or_fetch(
+        normalize_location(location_name),
+        lambda: _fetch_weather_snapshot(location_name),
+        cacheable=lambda result: result[0] is not None and not result[1]
+    )
+    if snapshot is not None:
+        snapshot = dict(snapshot, location=location_name)
+    return snapshot, errors
+
+
+async def _fetch_weather_snapshot(location_name):
+    lat, lon = await aget_coordinates(location_name)
+    if lat is None or lon is None:
+        return None, {}
+
+    results, timings = await gather_timed({
+        "forecast": afetch_forecast_bundle(lat, lon),
+        "air_quality": afetch_air_quality_data(lat, lon)
+    })
+    errors = _split_errors(results)
+    return weather_snapshot(location_name, lat, lon, results["forecast"], results["air_quality"], timings), errors
+
+
+async def fetch_weather_snapshots(location_names, include_air_quality=True):
+    """Snapshots for many locations using a handful of multi-coordinate requests.
+
+    Returns a dict mapping each location name to its snapshot (None when the
+    location could not be geocoded).
+    """
+    names = list(dict.fromkeys(location_names))
+    coords = dict(zip(names, await asyncio.gather(*(aget_coordinates(name) for name in names))))
+    found = [name for name in names if coords[name][0] is not None]
+    points = [coords[name] for name in found]
+
+    fetchers = {"forecast": afetch_forecast_batch(points)}
+    if include_air_quality:
+        fetchers["air_quality"] = afetch_air_quality_batch(points)
+    results, timings = await gather_timed(fetchers)
+    _split_errors(results)
+    bundles = results["forecast"] or [None] * len(found)
+    air_quality = results.get("air_quality") or [None] * len(found)
+
+    batch = {name: None for name in names}
+    for name, (lat, lon), bundle, aq in zip(found, points, bundles, air_quality):
+        batch[name] = weather_snapshot(name, lat, lon, bundle, aq, timings)
+    return batch